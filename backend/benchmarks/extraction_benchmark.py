@@ -0,0 +1,81 @@
+"""Microbenchmark of product field extraction against saved Falabella pages.
+
+Reports the parser change on its own (full document with `html.parser`, full document
+with lxml, lxml on the product container only), then compares the old per-field
+selector cascade with the compiled single-pass plan on the same parsed soup.
+
+Usage (from the backend directory):
+    python -m benchmarks.extraction_benchmark pages/*.html --repeat 20
+"""
+import sys
+import time
+import logging
+import argparse
+from bs4 import BeautifulSoup
+from src.extraction_plan import PRODUCT_PLAN, HTML_PARSER, parse_product_html
+
+FIELDS = ["title", "price", "available_sizes", "image_links", "specifications", "additional_info"]
+
+
+def _timed(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def _legacy_field(soup, field):
+    """Old style: walk the whole document once per selector until one matches."""
+    for rule in PRODUCT_PLAN.rules:
+        if rule.serves != field:
+            continue
+        for selector in rule.selectors:
+            elements = soup.select(selector) if rule.many else [soup.select_one(selector)]
+            values = [rule.extract(element) for element in elements if element is not None]
+            if any(values):
+                break
+
+
+def benchmark_page(path, repeat):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+
+    html_parser_ms, _ = _timed(lambda: BeautifulSoup(html, "html.parser"), repeat)
+    lxml_ms, _ = _timed(lambda: BeautifulSoup(html, HTML_PARSER), repeat)
+    container_ms, (soup, page_title) = _timed(lambda: parse_product_html(html), repeat)
+
+    print(f"\n{path} ({len(html) / 1024:.0f} KB)")
+    print(f"  {'parse':<30}{'ms':>12}")
+    print(f"  {'html.parser, documento':<30}{html_parser_ms:>12.2f}")
+    print(f"  {HTML_PARSER + ', documento':<30}{lxml_ms:>12.2f}")
+    print(f"  {HTML_PARSER + ', contenedor':<30}{container_ms:>12.2f}")
+
+    # Cascada y plan sobre el mismo soup: la diferencia es solo la extracción
+    print(f"  {'campo':<18}{'cascada ms':>12}{'plan ms':>12}")
+    cascade_total = 0.0
+    for field in FIELDS:
+        cascade_ms, _ = _timed(lambda: _legacy_field(soup, field), repeat)
+        plan_ms, _ = _timed(lambda: PRODUCT_PLAN.run(soup, page_title, fields=[field]), repeat)
+        cascade_total += cascade_ms
+        print(f"  {field:<18}{cascade_ms:>12.2f}{plan_ms:>12.2f}")
+
+    plan_run_ms, values = _timed(lambda: PRODUCT_PLAN.run(soup, page_title), repeat)
+    print(f"  {'total':<18}{cascade_total:>12.2f}{plan_run_ms:>12.2f}")
+    print(f"  campos encontrados: {sorted(values)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="+", help="Saved product page HTML files")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement (best is reported)")
+    args = parser.parse_args(argv)
+    logging.getLogger("src.extraction_plan").setLevel(logging.WARNING)
+
+    for path in args.pages:
+        benchmark_page(path, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
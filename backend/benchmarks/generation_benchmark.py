@@ -0,0 +1,103 @@
+"""Latency, token usage and output of two-stage vs. fused script generation.
+
+Runs ContentGenerator.generate_content (generate + refine, two LLM calls) and
+ContentGenerator.generate_content_fused (one call) on the same metadata against
+the configured Groq model. Needs GROQ_API_KEY.
+
+Usage (from the backend directory):
+    python -m benchmarks.generation_benchmark --repeat 5
+    python -m benchmarks.generation_benchmark --metadata product.json --audience "Jóvenes" --tone Divertido
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+from langchain_core.callbacks import BaseCallbackHandler
+from src.content_generator import ContentGenerator
+
+SAMPLE_METADATA = {
+    "title": "Zapatillas Urbanas Running Mujer",
+    "price": "S/ 199.90",
+    "description": "{'Material exterior': 'Malla', 'Suela': 'Caucho', 'Uso': 'Running urbano'}",
+    "additional_info": "Material exterior: Malla, Suela: Caucho, Uso: Running urbano",
+    "available_sizes": "36, 37, 38, 39, 40",
+    "image_description": "Zapatillas de malla transpirable color blanco con detalles en rosa, "
+                         "suela gruesa de caucho y cordones planos.",
+}
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Collect per-call token usage reported by the Groq chat model."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        usage = (response.llm_output or {}).get("token_usage", {})
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+
+
+def run_mode(generator, mode, metadata, audience, tone, language):
+    counter = TokenCounter()
+    llm, fallback_llm = generator.llm, generator.fallback_llm
+    generator.llm = llm.with_config(callbacks=[counter])
+    # Las llamadas de respaldo (hedging) también consumen tokens
+    generator.fallback_llm = fallback_llm.with_config(callbacks=[counter])
+    try:
+        start = time.perf_counter()
+        if mode == "fused":
+            result = generator.generate_content_fused(metadata, audience, tone, language)
+        else:
+            result = generator.generate_content(metadata, audience, tone, language)
+        elapsed = time.perf_counter() - start
+    finally:
+        generator.llm, generator.fallback_llm = llm, fallback_llm
+    return elapsed, counter, result.get("refined_content", "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--metadata", help="JSON file with scraped product metadata (default: sample product)")
+    parser.add_argument("--audience", default="Jóvenes deportistas")
+    parser.add_argument("--tone", default="Entusiasta")
+    parser.add_argument("--language", default="Español")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    metadata = SAMPLE_METADATA
+    if args.metadata:
+        with open(args.metadata, encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    generator = ContentGenerator()
+    # Sin caché de resultados: cada repetición tiene que llamar al modelo
+    generator.cache = None
+    outputs = {}
+    print(f"{'modo':<12}{'llamadas':>9}{'mediana s':>11}{'p95 s':>8}{'tokens in':>11}{'tokens out':>12}")
+    for mode in ("sequential", "fused"):
+        latencies, prompt_tokens, completion_tokens, calls = [], [], [], 0
+        for _ in range(args.repeat):
+            elapsed, counter, output = run_mode(generator, mode, metadata, args.audience, args.tone, args.language)
+            latencies.append(elapsed)
+            prompt_tokens.append(counter.prompt_tokens)
+            completion_tokens.append(counter.completion_tokens)
+            calls = counter.calls
+            outputs.setdefault(mode, output)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, round(0.95 * (len(latencies) - 1)))]
+        print(f"{mode:<12}{calls:>9}{statistics.median(latencies):>11.2f}{p95:>8.2f}"
+              f"{statistics.mean(prompt_tokens):>11.0f}{statistics.mean(completion_tokens):>12.0f}")
+
+    for mode, output in outputs.items():
+        print(f"\n--- {mode} ---\n{output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
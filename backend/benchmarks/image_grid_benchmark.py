@@ -0,0 +1,120 @@
+"""Peak memory and CPU time per 2x2 image grid, old pipeline vs. draft-mode pipeline.
+
+Each measurement runs in a fresh process so its peak RSS is not polluted by
+earlier runs. Source images are synthetic JPEG/PNG files of several sizes.
+
+Usage (from the backend directory):
+    python -m benchmarks.image_grid_benchmark --sizes 500 1000 2000 4000
+"""
+import sys
+import time
+import base64
+import random
+import logging
+import argparse
+import resource
+import multiprocessing
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+TILE = (300, 300)
+
+
+def _make_image(side, fmt, seed):
+    rng = random.Random(seed)
+    img = Image.new("RGB", (side, side), "white")
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(side), rng.randrange(side)
+        x1, y1 = x0 + rng.randrange(side // 2), y0 + rng.randrange(side // 2)
+        draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _legacy_grid(blobs):
+    """The pipeline before draft decoding and streamed base64."""
+    images = []
+    for data in blobs:
+        img = Image.open(BytesIO(data))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        images.append(img.resize(TILE))
+    cols = 2
+    grid = Image.new("RGB", (cols * TILE[0], cols * TILE[1]), color="white")
+    for i, img in enumerate(images):
+        grid.paste(img, ((i % cols) * TILE[0], (i // cols) * TILE[1]))
+    buffered = BytesIO()
+    grid.save(buffered, format="JPEG", quality=85)
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def _current_grid(blobs):
+    from src.image_describer import ImageGridDescriber, build_grid, decode_tile
+    tiles = [decode_tile(data, TILE) for data in blobs]
+    return ImageGridDescriber.encode_image(build_grid(tiles, TILE))
+
+
+def _memory_kb(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return None
+
+
+def _reset_peak():
+    """Reset VmHWM to the current RSS (Linux); return False when unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _measure(pipeline, blobs, queue):
+    logging.disable(logging.CRITICAL)
+    # Importar antes de medir para no contar la carga de módulos
+    import src.image_describer  # noqa: F401
+    if _reset_peak():
+        before = _memory_kb("VmRSS")
+    else:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_start = time.process_time()
+    (_legacy_grid if pipeline == "legacy" else _current_grid)(blobs)
+    cpu = time.process_time() - cpu_start
+    after = _memory_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((cpu, max(after - before, 0)))
+
+
+def run_case(pipeline, blobs):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(pipeline, blobs, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "PNG"])
+    args = parser.parse_args(argv)
+
+    print(f"{'formato':<8}{'lado px':>9}{'legacy cpu ms':>15}{'legacy pico MB':>16}"
+          f"{'nuevo cpu ms':>14}{'nuevo pico MB':>15}")
+    for fmt in args.formats:
+        for side in args.sizes:
+            blobs = [_make_image(side, fmt, seed) for seed in range(4)]
+            legacy_cpu, legacy_peak = run_case("legacy", blobs)
+            current_cpu, current_peak = run_case("current", blobs)
+            print(f"{fmt:<8}{side:>9}{legacy_cpu * 1000:>15.1f}{legacy_peak / 1024:>16.1f}"
+                  f"{current_cpu * 1000:>14.1f}{current_peak / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -12,4 +13,32 @@ class ContentGeneration(BaseModel):
     new_target_audience: str = Field(..., description="Audiencia objetivo del contenido")
     new_tone: str = Field(..., description="Tono deseado para el contenido")
     language: str = Field(..., description="Idioma en el que se generará el contenido")
+    pipeline: Optional[str] = Field(
+        None,
+        description="Modo de generación: 'sequential', 'speculative' o 'fused' (por defecto CONTENT_PIPELINE_MODE)"
+    )
+    vision_deadline: Optional[float] = Field(
+        None, description="Segundos máximos de espera a la descripción de imágenes en modo 'speculative'"
+    )
 
+
+class ContentVariant(BaseModel):
+    new_target_audience: str = Field(..., description="Audiencia objetivo del contenido")
+    new_tone: str = Field(..., description="Tono deseado para el contenido")
+    language: str = Field(..., description="Idioma en el que se generará el contenido")
+
+
+class ContentVariantsGeneration(BaseModel):
+    url: str = Field(..., description="URL del producto a analizar")
+    variants: List[ContentVariant] = Field(..., min_items=1, description="Combinaciones de audiencia, tono e idioma")
+
+
+class ContentBatchGeneration(BaseModel):
+    urls: List[str] = Field(..., min_items=1, description="URLs de los productos a analizar")
+    new_target_audience: str = Field(..., description="Audiencia objetivo del contenido")
+    new_tone: str = Field(..., description="Tono deseado para el contenido")
+    language: str = Field(..., description="Idioma en el que se generará el contenido")
+    pipeline: Optional[str] = Field(None, description="Modo de generación para todas las URLs")
+    vision_deadline: Optional[float] = Field(
+        None, description="Segundos máximos de espera a la descripción de imágenes en modo 'speculative'"
+    )
@@ -15,4 +15,23 @@ Keep the content concise, compelling, and focused on the product's key benefits.
 Respond with a product script that would catch attention on social media.
 
 {format_instructions}
-"""
\ No newline at end of file
+"""
+
+GENERATE_INFO_TEXT_ONLY = """
+You are a professional content writer specializing in creating engaging product descriptions.
+
+Product Information:
+- Title: {title}
+- Price: {price}
+- Description: {description}
+- Available Sizes: {available_sizes}
+- Additional Information: {additional_info}
+
+Your task is to create an engaging and attention-grabbing promotional script for this product. 
+Keep the content concise, compelling, and focused on the product's key benefits.
+Do not invent colors, materials or visual details that are not stated above; they will be added later.
+
+Respond with a product script that would catch attention on social media.
+
+{format_instructions}
+"""
@@ -22,4 +22,64 @@ Maintain the key selling points of the product while adapting the language, styl
 Please provide the refined content that accomplishes these goals.
 
 {format_instructions}
-"""
\ No newline at end of file
+"""
+
+GENERATE_REFINED_INFO_WITH_VISUALS = """
+You are a professional content writer specializing in adapting marketing content for specific audiences and tones.
+
+Original Content:
+```
+{previous_script}
+```
+
+Visual Description of the Product:
+```
+{image_description}
+```
+
+Adaptation Requirements:
+- Target Audience: {new_target_audience}
+- Desired Tone: {new_tone}
+- Language: {language}
+
+Your task is to rewrite the original content to better appeal to the specified target audience, using the desired tone and language.
+Maintain the key selling points of the product while adapting the language, style, and approach to better resonate with the target audience.
+
+1. Weave the most appealing visual details (color, material, style) into the script
+2. Adapt vocabulary and references to match the target audience's preferences and knowledge
+3. Adjust the tone to match the requested style (e.g., professional, casual, enthusiastic, etc.)
+4. Ensure the content uses appropriate expressions and conventions for the specified language
+5. Keep the message concise and impactful
+
+Please provide the refined content that accomplishes these goals.
+
+{format_instructions}
+"""
+
+
+GENERATE_FUSED_INFO = """
+You are a professional content writer specializing in engaging product scripts tailored to specific audiences and tones.
+
+Product Information:
+- Title: {title}
+- Price: {price}
+- Description: {description}
+- Available Sizes: {available_sizes}
+- Additional Information: {additional_info}
+- Visual Description: {image_description}
+
+Script Requirements:
+- Target Audience: {new_target_audience}
+- Desired Tone: {new_tone}
+- Language: {language}
+
+Your task is to write, in a single pass, an attention-grabbing promotional script for social media that is already adapted to the requirements above.
+
+1. Focus on the product's key benefits and its most appealing visual details
+2. Use vocabulary and references that match the target audience's preferences and knowledge
+3. Write in the requested tone (e.g., professional, casual, enthusiastic, etc.)
+4. Use appropriate expressions and conventions for the specified language
+5. Keep the message concise and impactful
+
+{format_instructions}
+"""
@@ -0,0 +1,274 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, CancelledError as FutureCancelledError
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Recurso -> (variable de entorno, límite por defecto) de llamadas simultáneas por proceso
+RESOURCE_LIMITS = {
+    "vision": ("VISION_MAX_CONCURRENCY", "4"),
+    "llm": ("LLM_MAX_CONCURRENCY", "8"),
+}
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def grant(self):
+        self.event.set()
+        return True
+
+
+class _AsyncWaiter:
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+    def _wake(self):
+        # Si la espera se canceló entretanto, __aenter__ devuelve el cupo
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def grant(self):
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # Event loop cerrado: el cupo pasa al siguiente en la cola
+            return False
+        self.granted = True
+        return True
+
+
+class ResourceLimiter:
+    """Cap concurrent use of a scarce resource and record how long callers queue for it.
+
+    Threads and coroutines share the slots and one FIFO queue: a released slot goes straight to
+    the oldest waiter, waking a thread's event or a coroutine's future on its own event loop.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._free = limit
+        self._waiters = deque()
+        self._in_flight = 0
+        self._waiting = 0
+        self._total = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _acquired(self, start):
+        waited = time.monotonic() - start
+        with self._lock:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._total += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+    def _take_or_queue(self, waiter):
+        """Take a free slot (True) or queue `waiter` behind the callers already waiting (False)."""
+        with self._lock:
+            self._waiting += 1
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _release(self):
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft().grant():
+                    return
+            self._free += 1
+
+    def __enter__(self):
+        start = time.monotonic()
+        waiter = _ThreadWaiter()
+        if not self._take_or_queue(waiter):
+            waiter.event.wait()
+        self._acquired(start)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._in_flight -= 1
+        self._release()
+        return False
+
+    async def __aenter__(self):
+        """Acquire from a coroutine; the same slots are shared with threads using `with`."""
+        start = time.monotonic()
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        if not self._take_or_queue(waiter):
+            try:
+                await waiter.future
+            except BaseException:
+                with self._lock:
+                    self._waiting -= 1
+                    granted = waiter.granted
+                    if not granted:
+                        self._waiters.remove(waiter)
+                # Cancelada después de recibir el cupo: pasarlo al siguiente
+                if granted:
+                    self._release()
+                raise
+        self._acquired(start)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def stats(self):
+        """Return the limit, current occupancy and queueing times."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "total": self._total,
+                "avg_wait_seconds": round(self._total_wait / self._total, 3) if self._total else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Return the process-wide limiter for one of RESOURCE_LIMITS."""
+    with _limiters_lock:
+        if name not in _limiters:
+            env_var, default = RESOURCE_LIMITS[name]
+            _limiters[name] = ResourceLimiter(name, int(os.getenv(env_var, default)))
+        return _limiters[name]
+
+
+def limiter_stats():
+    """Stats of every limiter created so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key: one leader runs, followers share its result.
+
+    Threads and coroutines share the same groups, so a batch worker and an async request for the
+    same key run the work once.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._leaders = 0
+        self._followers = 0
+
+    def _join(self, key):
+        """Return (shared future, True if the caller must run the work)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._followers += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._leaders += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # El líder fue cancelado: los seguidores no reciben un resultado a medias
+            future.cancel()
+
+    def do(self, key, fn, *args):
+        """Run fn(*args) once per key among concurrent callers; return (result, shared)."""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except FutureCancelledError:
+                # El líder se canceló: el primero en volver toma el relevo
+                continue
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    async def ado(self, key, coro_fn, *args):
+        """Async version of do(): await coro_fn(*args) once per key; return (result, shared)."""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # shield: cancelar a un seguidor no debe cancelar el futuro compartido
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        try:
+            result = await coro_fn(*args)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    def stats(self):
+        """Return leader/follower counts; every follower is a duplicate execution that was saved."""
+        with self._lock:
+            calls = self._leaders + self._followers
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._leaders,
+                "saved_executions": self._followers,
+                "saved_ratio": round(self._followers / calls, 3) if calls else 0.0,
+            }
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name):
+    """Return the process-wide single-flight group with the given name."""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def flight_stats():
+    """Stats of every single-flight group created so far."""
+    with _flights_lock:
+        flights = dict(_flights)
+    return {name: flight.stats() for name, flight in flights.items()}
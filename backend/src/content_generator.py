@@ -1,128 +1,415 @@
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from src.llm import GroqModelHandler
-from prompts.content_generation_prompts import GENERATE_INFO
-from prompts.tone_generator import GENERATE_REFINED_INFO
+import os
+import time
+import asyncio
+import logging
+from collections import namedtuple
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from langchain_core.runnables import RunnableLambda
+from src.registry import get_registry
+from src.concurrency import get_limiter
+from src.groq_scheduler import get_scheduler, estimate_tokens
+from src.hedging import get_hedger, raise_if_abandoned
+from src.result_cache import get_result_cache, fingerprint
+from prompts.content_generation_prompts import GENERATE_INFO, GENERATE_INFO_TEXT_ONLY
+from prompts.tone_generator import GENERATE_REFINED_INFO, GENERATE_REFINED_INFO_WITH_VISUALS, GENERATE_FUSED_INFO
 from models.content_generation_models import ContentGenerationScript, ToneGenerationScript
 
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Sustituye las instrucciones de formato JSON cuando el guion se transmite token a token
+PLAIN_TEXT_INSTRUCTIONS = "Respond only with the final script text, without JSON, headings or any preamble."
+
+PRODUCT_VARIABLES = ["title", "price", "description", "available_sizes", "additional_info"]
+ADAPTATION_VARIABLES = ["new_target_audience", "new_tone", "language"]
+
+# Un paso del pipeline: capa de la caché de resultados, clave, cadena, entradas, clave de salida,
+# respuesta de respaldo y mensaje de error
+Step = namedtuple("Step", "layer cache_key chain inputs key fallback error")
+
+
 class ContentGenerator:
-    def __init__(self):
-        # Initialize the Groq LLM handler
-        llm_handler = GroqModelHandler()
-        self.llm = llm_handler.get_llm()
-    
+    def __init__(self, registry=None):
+        # Clientes, modelos, parsers y prompts son del proceso; aquí solo vive el estado de la solicitud
+        self.registry = registry or get_registry()
+        self.llm = self.registry.llm
+        self.fallback_llm = self.registry.fallback_llm
+        # Tiempos y decisiones de la última ejecución del pipeline
+        self.pipeline_report = {}
+        # Capa de la caché de resultados -> "memory", "store" o "miss" en la última ejecución
+        self.cache = get_result_cache()
+        self.cache_report = {}
+
     def create_parser(self):
-        """Create a Pydantic output parser."""
-        return PydanticOutputParser(pydantic_object=ContentGenerationScript)
-    
+        """Return the shared Pydantic output parser for the base script."""
+        return self.registry.parser(ContentGenerationScript)
+
     def create_tone_parser(self):
-        """Create a Pydantic output parser for tone refinement."""
-        return PydanticOutputParser(pydantic_object=ToneGenerationScript)
-    
+        """Return the shared Pydantic output parser for tone refinement."""
+        return self.registry.parser(ToneGenerationScript)
+
     def create_script_chain(self, template, parser, input_variables):
-        """Create a chain that generates script content."""
-        prompt = PromptTemplate(
-            template=template,
-            input_variables=input_variables,
-            partial_variables={"format_instructions": parser.get_format_instructions()}
-        )
-        
-        return prompt | self.llm | parser
-    
-    def generate_text(self, info):
-        """Genera un texto basado en la información de entrada."""
-        parser = self.create_parser()
-        content_chain = self.create_script_chain(
-            template=GENERATE_INFO,
-            parser=parser,
-            input_variables=[
-                "title",
-                "price",
-                "description",
-                "available_sizes",
-                "additional_info",
-                "image_description",
-            ],
-        )
+        """Return the registry's chain that generates script content from a compiled prompt.
+
+        The chain is shared by every request: its LLM step only reads the registry's models,
+        while the lane and hedge budget come from the caller's context variables.
+        """
+        def build():
+            prompt = self.registry.prompt(template, input_variables, parser=parser)
+            return prompt | RunnableLambda(self._call_llm, afunc=self._acall_llm) | parser
+
+        return self.registry.chain((template, parser.pydantic_object), build)
+
+    def precompile(self):
+        """Build every prompt, parser and chain once (via ModelRegistry.precompile at startup)."""
+        info = dict.fromkeys(PRODUCT_VARIABLES + ["image_description"], "")
+        self._text_step(info)
+        self._draft_step(info)
+        self._refine_step("", "", "", "")
+        self._refine_with_visuals_step("", "", "", "", "")
+        self._fused_step(info, "", "", "")
+        self._plain_refine_prompt()
+
+    @property
+    def model_name(self):
+        return getattr(self.llm, "model_name", None)
+
+    def _estimate_tokens(self, prompt_value):
+        return estimate_tokens(prompt_value.to_string(), getattr(self.llm, "max_tokens", None))
+
+    def _scheduled_call(self, llm, prompt_value, config, abandoned=None):
+        def invoke():
+            with get_limiter("llm"):
+                # Con cuota y cupo ya obtenidos: no enviar un respaldo que ya no hace falta
+                raise_if_abandoned(abandoned)
+                return llm.invoke(prompt_value, config)
+
+        model_name = getattr(llm, "model_name", None)
+        return get_scheduler().call(model_name, invoke, self._estimate_tokens(prompt_value))
 
+    async def _ascheduled_call(self, llm, prompt_value, config):
+        async def invoke():
+            async with get_limiter("llm"):
+                return await llm.ainvoke(prompt_value, config)
+
+        model_name = getattr(llm, "model_name", None)
+        return await get_scheduler().acall(model_name, invoke, self._estimate_tokens(prompt_value))
+
+    def _call_llm(self, prompt_value, config):
+        """Invoke the LLM within its Groq quota and the LLM concurrency limit, hedging slow calls.
+
+        Quota and slot are taken before hedging starts, so only the API call is timed and hedged;
+        the backup call takes its own quota and slot for the fallback model.
+        """
+        def hedged():
+            with get_limiter("llm"):
+                return get_hedger("llm").call(
+                    lambda: self.llm.invoke(prompt_value, config),
+                    lambda abandoned: self._scheduled_call(self.fallback_llm, prompt_value, config, abandoned),
+                )
+
+        return get_scheduler().call(self.model_name, hedged, self._estimate_tokens(prompt_value))
+
+    async def _acall_llm(self, prompt_value, config):
+        """Async counterpart of _call_llm; waiting for quota or a slot does not block the event loop."""
+        async def hedged():
+            async with get_limiter("llm"):
+                return await get_hedger("llm").acall(
+                    lambda: self.llm.ainvoke(prompt_value, config),
+                    lambda: self._ascheduled_call(self.fallback_llm, prompt_value, config),
+                )
+
+        return await get_scheduler().acall(self.model_name, hedged, self._estimate_tokens(prompt_value))
+
+    @staticmethod
+    def _normalize(result, key):
+        # Verificar si el resultado es un diccionario con la clave esperada; si no, crear la estructura
+        if isinstance(result, dict) and key in result:
+            return result
+        return {key: str(result)}
+
+    def _cached(self, step):
+        """Return the cached output of a step, recording in cache_report whether its layer hit."""
+        if self.cache is None:
+            return None
+        value, source = self.cache.get(step.layer, step.cache_key)
+        self.cache_report[step.layer] = source
+        return value
+
+    def _store(self, step, result):
+        if self.cache is not None:
+            self.cache.put(step.layer, step.cache_key, result)
+
+    def _invoke(self, step):
+        cached = self._cached(step)
+        if cached is not None:
+            return cached
         try:
-            result = content_chain.invoke(
-                {
-                    "title": info["title"],
-                    "price": info["price"],
-                    "description": info["description"],
-                    "available_sizes": info["available_sizes"],
-                    "additional_info": info["additional_info"],
-                    "image_description": info["image_description"],
-                }
-            )
-            
-            # Verificar si el resultado es un diccionario y si tiene la clave 'content'
-            if isinstance(result, dict):
-                if "content" in result:
-                    return result
-                else:
-                    # Si no tiene la clave 'content', crear una estructura adecuada
-                    return {"content": str(result)}
-            else:
-                # Si no es un diccionario, crear una estructura adecuada
-                return {"content": str(result)}
-                
+            result = self._normalize(step.chain.invoke(step.inputs), step.key)
+        except Exception as e:
+            print(f"{step.error}: {e}")
+            return step.fallback
+        # Las respuestas de respaldo no se guardan: el siguiente intento vuelve a llamar al LLM
+        self._store(step, result)
+        return result
+
+    async def _ainvoke(self, step):
+        # La caché lee y escribe SQLite: en un hilo para no bloquear el event loop
+        cached = await asyncio.to_thread(self._cached, step)
+        if cached is not None:
+            return cached
+        try:
+            result = self._normalize(await step.chain.ainvoke(step.inputs), step.key)
         except Exception as e:
-            print(f"Error al generar texto: {e}")
-            # En caso de error, devolver un texto predeterminado
-            return {"content": f"¡Descubre el producto {info['title']} a un precio increíble de {info['price']}! {info['image_description']}"}
-    
+            print(f"{step.error}: {e}")
+            return step.fallback
+        await asyncio.to_thread(self._store, step, result)
+        return result
+
+    def _step(self, layer, template, parser, input_variables, inputs, key, fallback, error):
+        """Build a Step; its cache key covers the prompt template, the model and the exact inputs."""
+        chain = self.create_script_chain(template=template, parser=parser, input_variables=input_variables)
+        cache_key = fingerprint(template, self.model_name, inputs)
+        return Step(layer, cache_key, chain, inputs, key, fallback, error)
+
+    # Cada paso se construye una vez y se comparte entre la versión síncrona y la asíncrona
+
+    def _text_step(self, info):
+        inputs = {variable: info[variable] for variable in PRODUCT_VARIABLES + ["image_description"]}
+        # En caso de error, devolver un texto predeterminado
+        fallback = {"content": f"¡Descubre el producto {info['title']} a un precio increíble de {info['price']}! {info['image_description']}"}
+        return self._step("base", GENERATE_INFO, self.create_parser(), list(inputs), inputs,
+                          "content", fallback, "Error al generar texto")
+
+    def _draft_step(self, info):
+        inputs = {variable: info[variable] for variable in PRODUCT_VARIABLES}
+        fallback = {"content": f"¡Descubre el producto {info['title']} a un precio increíble de {info['price']}!"}
+        return self._step("base", GENERATE_INFO_TEXT_ONLY, self.create_parser(), list(inputs), inputs,
+                          "content", fallback, "Error al generar el borrador")
+
+    def _refine_step(self, original_content, new_target_audience, new_tone, language):
+        inputs = {
+            "previous_script": original_content,
+            "new_target_audience": new_target_audience,
+            "new_tone": new_tone,
+            "language": language,
+        }
+        fallback = {"refined_content": f"Versión refinada (error): {original_content}"}
+        return self._step("refined", GENERATE_REFINED_INFO, self.create_tone_parser(), list(inputs), inputs,
+                          "refined_content", fallback, "Error al refinar el contenido")
+
+    def _refine_with_visuals_step(self, draft, image_description, new_target_audience, new_tone, language):
+        inputs = {
+            "previous_script": draft,
+            "image_description": image_description,
+            "new_target_audience": new_target_audience,
+            "new_tone": new_tone,
+            "language": language,
+        }
+        fallback = {"refined_content": f"Versión refinada (error): {draft}"}
+        return self._step("refined", GENERATE_REFINED_INFO_WITH_VISUALS, self.create_tone_parser(), list(inputs),
+                          inputs, "refined_content", fallback,
+                          "Error al refinar el contenido con la descripción visual")
+
+    def _fused_step(self, metadata, new_target_audience, new_tone, language):
+        inputs = {variable: metadata[variable] for variable in PRODUCT_VARIABLES + ["image_description"]}
+        inputs.update(new_target_audience=new_target_audience, new_tone=new_tone, language=language)
+        fallback = {"refined_content": f"¡Descubre el producto {metadata['title']} a un precio increíble de {metadata['price']}! {metadata['image_description']}"}
+        return self._step("refined", GENERATE_FUSED_INFO, self.create_tone_parser(), list(inputs), inputs,
+                          "refined_content", fallback, "Error al generar el contenido en una sola llamada")
+
+    def generate_text(self, info):
+        """Genera un texto basado en la información de entrada."""
+        return self._invoke(self._text_step(info))
+
+    async def agenerate_text(self, info):
+        """Async version of generate_text."""
+        return await self._ainvoke(self._text_step(info))
+
+    def generate_draft(self, info):
+        """Draft the base script from the textual metadata only, without the image description."""
+        return self._invoke(self._draft_step(info))
+
+    async def agenerate_draft(self, info):
+        """Async version of generate_draft."""
+        return await self._ainvoke(self._draft_step(info))
+
+    def refine_with_visuals(self, draft, image_description, new_target_audience, new_tone, language):
+        """Refine a text-only draft for audience, tone and language while adding the visual details."""
+        return self._invoke(self._refine_with_visuals_step(draft, image_description, new_target_audience, new_tone, language))
+
+    async def arefine_with_visuals(self, draft, image_description, new_target_audience, new_tone, language):
+        """Async version of refine_with_visuals."""
+        return await self._ainvoke(self._refine_with_visuals_step(draft, image_description, new_target_audience, new_tone, language))
+
     def refine_content(self, original_content, new_target_audience, new_tone, language):
         """Refina el contenido original según la audiencia, tono e idioma especificados."""
-        parser = self.create_tone_parser()
-        refine_chain = self.create_script_chain(
-            template=GENERATE_REFINED_INFO,
-            parser=parser,
-            input_variables=["previous_script", "new_target_audience", "new_tone", "language"]
+        return self._invoke(self._refine_step(original_content, new_target_audience, new_tone, language))
+
+    async def arefine_content(self, original_content, new_target_audience, new_tone, language):
+        """Async version of refine_content."""
+        return await self._ainvoke(self._refine_step(original_content, new_target_audience, new_tone, language))
+
+    def _plain_refine_prompt(self):
+        return self.registry.prompt(
+            GENERATE_REFINED_INFO, ["previous_script"] + ADAPTATION_VARIABLES,
+            format_instructions=PLAIN_TEXT_INSTRUCTIONS,
         )
-        
-        try:
-            result = refine_chain.invoke({
-                "previous_script": original_content,
-                "new_target_audience": new_target_audience,
-                "new_tone": new_tone,
-                "language": language
-            })
-            
-            # Verificar resultado y manejar diferentes estructuras
-            if isinstance(result, dict) and "refined_content" in result:
-                return result
-            elif isinstance(result, dict):
-                return {"refined_content": str(result)}
-            else:
-                return {"refined_content": str(result)}
-                
-        except Exception as e:
-            print(f"Error al refinar el contenido: {e}")
-            return {"refined_content": f"Versión refinada (error): {original_content}"}
-    
+
+    async def astream_refined_content(self, original_content, new_target_audience, new_tone, language):
+        """Yield the refined script as plain-text chunks while the LLM generates it."""
+        prompt = self._plain_refine_prompt()
+        inputs = {
+            "previous_script": original_content,
+            "new_target_audience": new_target_audience,
+            "new_tone": new_tone,
+            "language": language,
+        }
+        # Solo se reserva la cuota: un 429 a mitad de stream no se puede reintentar sin repetir tokens
+        await get_scheduler().aacquire(self.model_name, self._estimate_tokens(prompt.format_prompt(**inputs)))
+        async with get_limiter("llm"):
+            async for chunk in (prompt | self.llm).astream(inputs):
+                if chunk.content:
+                    yield chunk.content
+
+    def refine_variants(self, original_content, variants, max_concurrency=None):
+        """Refine one base script into every (audience, tone, language) variant with bounded parallelism.
+
+        Returns (refined, errors): errors[i] is None, or the message of the failure that left
+        variant i without a refined script (refined[i] is then None).
+        """
+        max_concurrency = max_concurrency or int(os.getenv("VARIANT_MAX_CONCURRENCY", "4"))
+        steps = [
+            self._refine_step(original_content, variant["new_target_audience"], variant["new_tone"],
+                              variant["language"])
+            for variant in variants
+        ]
+        refined = [self._cached(step) for step in steps]
+        errors = [None] * len(steps)
+        misses = [index for index, result in enumerate(refined) if result is None]
+        if not misses:
+            return refined, errors
+        self.cache_report["refined"] = "miss"
+
+        # Solo las variantes sin caché van al LLM; un fallo en una no cancela las demás
+        chain = steps[misses[0]].chain
+        results = chain.batch(
+            [steps[index].inputs for index in misses],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        for index, result in zip(misses, results):
+            step = steps[index]
+            if isinstance(result, Exception):
+                logger.warning(f"{step.error} (variante {index}): {result}", exc_info=result)
+                errors[index] = str(result)
+                continue
+            refined[index] = self._normalize(result, step.key)
+            self._store(step, refined[index])
+        return refined, errors
+
+    def generate_content_fused(self, metadata, new_target_audience, new_tone, language):
+        """Generate the audience-, tone- and language-specific script in a single LLM call."""
+        start = time.time()
+        refined_content = self._invoke(self._fused_step(metadata, new_target_audience, new_tone, language))
+        self.pipeline_report = {"mode": "fused", "total_seconds": round(time.time() - start, 2)}
+        return refined_content
+
+    async def agenerate_content_fused(self, metadata, new_target_audience, new_tone, language):
+        """Async version of generate_content_fused."""
+        start = time.time()
+        refined_content = await self._ainvoke(self._fused_step(metadata, new_target_audience, new_tone, language))
+        self.pipeline_report = {"mode": "fused", "total_seconds": round(time.time() - start, 2)}
+        return refined_content
+
     def generate_content(self, metadata, new_target_audience, new_tone, language):
         """Genera y refina el contenido completo."""
-        # Primero generar el contenido original
+        self.pipeline_report = {"mode": "sequential"}
+        # Primero generar el contenido original y luego refinarlo según los parámetros especificados
         original_content = self.generate_text(metadata)
-        
-        # Luego refinar el contenido según los parámetros especificados
-        if isinstance(original_content, dict) and "content" in original_content:
-            refined_content = self.refine_content(
-                original_content["content"],
-                new_target_audience,
-                new_tone,
-                language
+        return self.refine_content(original_content["content"], new_target_audience, new_tone, language)
+
+    async def agenerate_content(self, metadata, new_target_audience, new_tone, language):
+        """Async version of generate_content."""
+        self.pipeline_report = {"mode": "sequential"}
+        original_content = await self.agenerate_text(metadata)
+        return await self.arefine_content(original_content["content"], new_target_audience, new_tone, language)
+
+    def generate_content_speculative(self, metadata, image_future, new_target_audience, new_tone, language,
+                                     vision_deadline=None):
+        """Draft from text while the vision model runs, then refine once with the image description.
+
+        `image_future` resolves to the image description (None uses metadata["image_description"]).
+        If it is not ready `vision_deadline` seconds after the call started, the text-only draft is
+        refined and shipped without it.
+        """
+        start = time.time()
+        draft = self.generate_draft(metadata)["content"]
+        draft_seconds = time.time() - start
+
+        image_description = metadata.get("image_description")
+        if image_future is not None:
+            try:
+                image_description = image_future.result(timeout=self._vision_timeout(start, vision_deadline))
+            except FutureTimeoutError:
+                logger.warning(f"La descripción de imágenes no llegó en {vision_deadline}s, se envía la versión solo texto")
+                image_description = None
+        vision_wait_seconds = time.time() - start - draft_seconds
+
+        if image_description:
+            refined_content = self.refine_with_visuals(
+                draft, image_description, new_target_audience, new_tone, language
             )
-            return refined_content
         else:
-            # Manejar el caso donde original_content no tiene la estructura esperada
-            content_str = str(original_content)
-            refined_content = self.refine_content(
-                content_str,
-                new_target_audience,
-                new_tone,
-                language
+            refined_content = self.refine_content(draft, new_target_audience, new_tone, language)
+
+        self.pipeline_report = self._speculative_report(start, draft_seconds, vision_wait_seconds, image_description)
+        return refined_content
+
+    async def agenerate_content_speculative(self, metadata, image_future, new_target_audience, new_tone, language,
+                                            vision_deadline=None):
+        """Async version of generate_content_speculative; `image_future` may be a thread or asyncio future."""
+        start = time.time()
+        draft = (await self.agenerate_draft(metadata))["content"]
+        draft_seconds = time.time() - start
+
+        image_description = metadata.get("image_description")
+        if image_future is not None:
+            try:
+                # shield: al vencer el plazo la descripción sigue su curso (y llega a la caché)
+                image_description = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(image_future)),
+                    timeout=self._vision_timeout(start, vision_deadline),
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"La descripción de imágenes no llegó en {vision_deadline}s, se envía la versión solo texto")
+                image_description = None
+        vision_wait_seconds = time.time() - start - draft_seconds
+
+        if image_description:
+            refined_content = await self.arefine_with_visuals(
+                draft, image_description, new_target_audience, new_tone, language
             )
-            return refined_content
\ No newline at end of file
+        else:
+            refined_content = await self.arefine_content(draft, new_target_audience, new_tone, language)
+
+        self.pipeline_report = self._speculative_report(start, draft_seconds, vision_wait_seconds, image_description)
+        return refined_content
+
+    @staticmethod
+    def _vision_timeout(start, vision_deadline):
+        if vision_deadline is None:
+            return None
+        return max(vision_deadline - (time.time() - start), 0)
+
+    @staticmethod
+    def _speculative_report(start, draft_seconds, vision_wait_seconds, image_description):
+        return {
+            "mode": "speculative",
+            "vision_included": bool(image_description),
+            "draft_seconds": round(draft_seconds, 2),
+            "vision_wait_seconds": round(vision_wait_seconds, 2),
+            "total_seconds": round(time.time() - start, 2),
+        }
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+from src.perceptual_hash import HASH_BITS, match_hash_sets
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+
+def hash_bands(value, count):
+    """Split a hash into `count` bit slices; hashes within count - 1 bits share at least one slice."""
+    width, extra = divmod(HASH_BITS, count)
+    bands, shift = [], 0
+    for index in range(count):
+        bits = width + (index < extra)
+        bands.append((value >> shift) & ((1 << bits) - 1))
+        shift += bits
+    return bands
+
+
+class DescriptionCache:
+    """Vision-model descriptions in a SQLite file, looked up by perceptual hashes of the grid images.
+
+    Each stored hash is indexed by max_distance + 1 bit slices: a near-identical image shares at
+    least one slice exactly, so a lookup only compares the entries found through the index.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None, max_distance=None):
+        self.path = path or os.getenv("DESCRIPTION_CACHE_PATH", ".cache/descriptions.sqlite3")
+        self.ttl = ttl or int(os.getenv("DESCRIPTION_CACHE_TTL", str(7 * 86400)))
+        self.max_entries = max_entries or int(os.getenv("DESCRIPTION_CACHE_MAX_ENTRIES", "5000"))
+        # Bits distintos (de 64) tolerados por imagen para considerarla la misma foto
+        self.max_distance = max_distance if max_distance is not None else int(
+            os.getenv("DESCRIPTION_CACHE_MAX_DISTANCE", "6"))
+        self.band_count = self.max_distance + 1
+
+        # Solo protege los contadores: cada hilo usa su propia conexión y SQLite ordena las escrituras
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self.available = self._setup()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA foreign_keys=ON")
+        return db
+
+    def _setup(self):
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = self._db()
+            # WAL permite que los workers de gunicorn lean mientras otro escribe
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS descriptions ("
+                "id INTEGER PRIMARY KEY, model TEXT NOT NULL, size INTEGER NOT NULL, hashes TEXT NOT NULL, "
+                "description TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS hash_bands ("
+                "band INTEGER NOT NULL, value INTEGER NOT NULL, "
+                "entry_id INTEGER NOT NULL REFERENCES descriptions(id) ON DELETE CASCADE)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS hash_bands_lookup ON hash_bands (band, value)")
+            db.execute("CREATE INDEX IF NOT EXISTS hash_bands_entry ON hash_bands (entry_id)")
+            # user_version guarda cuántas franjas tiene el índice; si cambió max_distance se reconstruye
+            if db.execute("PRAGMA user_version").fetchone()[0] != self.band_count:
+                self._reindex(db)
+            db.commit()
+            entries = db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+            logger.info(f"Caché de descripciones abierta: {entries} entradas")
+            return True
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"No se pudo abrir la caché de descripciones, se desactiva: {e}")
+            return False
+
+    def _index_rows(self, entry_id, hashes):
+        return [
+            (band, value, entry_id)
+            for hash_value in set(hashes)
+            for band, value in enumerate(hash_bands(hash_value, self.band_count))
+        ]
+
+    def _reindex(self, db):
+        db.execute("DELETE FROM hash_bands")
+        for entry_id, hashes in db.execute("SELECT id, hashes FROM descriptions").fetchall():
+            db.executemany("INSERT INTO hash_bands (band, value, entry_id) VALUES (?, ?, ?)",
+                           self._index_rows(entry_id, json.loads(hashes)))
+        db.execute(f"PRAGMA user_version = {self.band_count}")
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def lookup(self, hashes, model):
+        """Return the stored description for a near-identical image set, or None."""
+        if not self.available:
+            return None
+        now = time.time()
+        # Cualquier imagen de la consulta debe tener pareja en la entrada: basta indexar la primera
+        bands = list(enumerate(hash_bands(hashes[0], self.band_count)))
+        condition = " OR ".join(["(b.band = ? AND b.value = ?)"] * len(bands))
+        try:
+            db = self._db()
+            rows = db.execute(
+                "SELECT DISTINCT d.id, d.hashes, d.description FROM hash_bands b "
+                "JOIN descriptions d ON d.id = b.entry_id "
+                f"WHERE ({condition}) AND d.model = ? AND d.size = ? AND d.expires_at > ?",
+                [part for band in bands for part in band] + [model, len(hashes), now],
+            ).fetchall()
+            best, best_distance = None, None
+            for entry_id, stored_hashes, description in rows:
+                distance = match_hash_sets(hashes, json.loads(stored_hashes), self.max_distance)
+                if distance is not None and (best_distance is None or distance < best_distance):
+                    best, best_distance = (entry_id, description), distance
+            if best is not None:
+                db.execute("UPDATE descriptions SET last_used = ? WHERE id = ?", (now, best[0]))
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error leyendo la caché de descripciones: {e}")
+            best = None
+        if best is None:
+            self._count("_misses")
+            return None
+        self._count("_hits")
+        logger.info(f"Descripción reutilizada de la caché (distancia {best_distance} bits)")
+        return best[1]
+
+    def store(self, hashes, model, description):
+        """Save a fresh description and evict expired or least recently used entries."""
+        if not self.available:
+            return
+        now = time.time()
+        try:
+            db = self._db()
+            cursor = db.execute(
+                "INSERT INTO descriptions (model, size, hashes, description, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (model, len(hashes), json.dumps(list(hashes)), description, now + self.ttl, now),
+            )
+            db.executemany("INSERT INTO hash_bands (band, value, entry_id) VALUES (?, ?, ?)",
+                           self._index_rows(cursor.lastrowid, hashes))
+            evicted = self._evict(db, now)
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo guardar la caché de descripciones: {e}")
+            return
+        if evicted:
+            self._count("_evictions", evicted)
+
+    def _evict(self, db, now):
+        evicted = db.execute("DELETE FROM descriptions WHERE expires_at <= ?", (now,)).rowcount
+        evicted += db.execute(
+            "DELETE FROM descriptions WHERE id IN (SELECT id FROM descriptions ORDER BY last_used "
+            "LIMIT max((SELECT COUNT(*) FROM descriptions) - ?, 0))",
+            (self.max_entries,),
+        ).rowcount
+        return evicted
+
+    def stats(self):
+        """Return hit/miss counters; every hit is a vision call that was not made."""
+        entries = None
+        if self.available:
+            try:
+                entries = self._db().execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_description_cache():
+    """Return the process-wide description cache, or None when disabled via DESCRIPTION_CACHE_ENABLED."""
+    global _cache
+    if os.getenv("DESCRIPTION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DescriptionCache()
+        return _cache
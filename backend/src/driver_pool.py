@@ -0,0 +1,298 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from src.resource_policy import RESOURCE_POLICY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+
+def create_chrome_driver(policy=RESOURCE_POLICY):
+    """Configure and return a Chrome WebDriver instance."""
+    logger.info("Configurando driver de Chrome...")
+
+    # Configurar opciones de Chrome
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Ejecutar en modo headless
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    # No esperar al evento load: PageReadiness decide cuándo la página está lista
+    chrome_options.page_load_strategy = "eager"
+
+    # User agent para evitar bloqueos
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+    # No descargar imágenes, fuentes, media ni trackers: solo leemos el DOM
+    policy.apply_to_options(chrome_options)
+
+    # Inicializar el driver
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+        policy.apply_to_driver(driver)
+        logger.info("Driver de Chrome configurado correctamente")
+        return driver
+    except Exception as e:
+        logger.error(f"Error al configurar driver de Chrome: {e}")
+        # Intentar con una configuración alternativa
+        try:
+            logger.info("Intentando configuración alternativa...")
+            chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_argument("--disable-notifications")
+            driver = webdriver.Chrome(options=chrome_options)
+            policy.apply_to_driver(driver)
+            return driver
+        except Exception as e2:
+            logger.error(f"Error en configuración alternativa: {e2}")
+            raise
+
+
+class DriverPool:
+    """Bounded pool of warm Chrome sessions that scrapers borrow and return."""
+
+    def __init__(self, size=None, max_pages=None, acquire_timeout=None, driver_factory=create_chrome_driver):
+        self.size = size or int(os.getenv("CHROME_POOL_SIZE", "2"))
+        self.max_pages = max_pages or int(os.getenv("CHROME_POOL_MAX_PAGES", "50"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("CHROME_POOL_ACQUIRE_TIMEOUT", "60"))
+        self.driver_factory = driver_factory
+
+        # Drivers libres (el último devuelto sale primero); quien espera uno lo hace en _available,
+        # que se avisa al devolver un driver y al liberar un hueco para crear otro
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._pages = {}  # id(driver) -> páginas servidas
+        self._created = 0
+        self._closed = False
+
+        # Métricas para dimensionar el pool por contenedor
+        self._acquires = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recycled = 0
+        self._crashed = 0
+
+    def prewarm(self, count=None):
+        """Launch drivers ahead of time so the first requests skip Chrome startup."""
+        count = min(count or self.size, self.size)
+        logger.info(f"Precalentando pool de Chrome con {count} drivers...")
+        for _ in range(count):
+            driver = self._try_create()
+            if driver is None:
+                break
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
+
+    def _try_create(self):
+        """Create a new driver if the pool still has room, otherwise return None."""
+        with self._lock:
+            if self._closed or self._created >= self.size:
+                return None
+            self._created += 1
+        return self._create()
+
+    def _create(self):
+        """Launch a driver for a slot already reserved in `_created`."""
+        try:
+            driver = self.driver_factory()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot in the pool."""
+        with self._available:
+            self._pages.pop(id(driver), None)
+            self._created -= 1
+            # Un hilo en espera puede crear el reemplazo sin esperar al timeout
+            self._available.notify()
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error al cerrar driver descartado: {e}")
+
+    @staticmethod
+    def is_healthy(driver):
+        """Check that the browser session still answers commands."""
+        try:
+            driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Borrow a healthy driver, waiting up to `timeout` seconds for one to free up."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            driver = self._wait_for_driver(deadline, timeout)
+            if driver is None:
+                driver = self._create()
+
+            if not self.is_healthy(driver):
+                logger.warning("Driver de Chrome no responde, reemplazándolo")
+                with self._lock:
+                    self._crashed += 1
+                self._discard(driver)
+                continue
+
+            waited = time.monotonic() - start
+            with self._lock:
+                self._acquires += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+            if waited > 0.5:
+                logger.info(f"Driver de Chrome obtenido tras esperar {waited:.2f}s")
+            return driver
+
+    def _wait_for_driver(self, deadline, timeout):
+        """Take an idle driver, or reserve a slot to create one (None); wait until `deadline` for either."""
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if not self._closed and self._created < self.size:
+                    self._created += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No hay drivers de Chrome disponibles tras {timeout:.1f}s (pool={self.size})"
+                    )
+                self._available.wait(remaining)
+
+    def _reset(self, driver):
+        """Clear cookies, storage, extra tabs and navigation state between uses."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            # Algunas páginas (about:blank, errores) no exponen storage
+            pass
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def release(self, driver, healthy=True):
+        """Return a driver to the pool, recycling it when worn out or broken."""
+        if driver is None:
+            return
+
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+            closed = self._closed
+
+        if closed:
+            self._discard(driver)
+            return
+
+        if not healthy:
+            logger.warning("Driver devuelto como no saludable, descartándolo")
+            with self._lock:
+                self._crashed += 1
+            self._discard(driver)
+            return
+
+        if pages >= self.max_pages:
+            logger.info(f"Reciclando driver de Chrome tras {pages} páginas")
+            with self._lock:
+                self._recycled += 1
+            self._discard(driver)
+            return
+
+        try:
+            self._reset(driver)
+        except Exception as e:
+            logger.warning(f"Error al reiniciar estado del driver, descartándolo: {e}")
+            with self._lock:
+                self._crashed += 1
+            self._discard(driver)
+            return
+
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    @contextmanager
+    def driver(self):
+        """Context manager that borrows a driver and always gives it back."""
+        driver = self.acquire()
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = self.is_healthy(driver)
+            raise
+        finally:
+            self.release(driver, healthy=healthy)
+
+    def stats(self):
+        """Return pool occupancy and wait-time metrics."""
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": idle,
+                "in_use": self._created - idle,
+                "max_pages_per_driver": self.max_pages,
+                "acquires": self._acquires,
+                "avg_wait_seconds": round(self._total_wait / self._acquires, 4) if self._acquires else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+            }
+
+    def close(self):
+        """Quit every idle driver; busy drivers are quit when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+        logger.info("Pool de drivers de Chrome cerrado")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+        return _pool
+
+
+def shutdown_driver_pool():
+    """Close the process-wide driver pool if it was created."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,261 @@
+import re
+import time
+import logging
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HTML_PARSER = "lxml"
+
+# Falabella monta todo el producto dentro del contenedor raíz de Next.js
+PRODUCT_CONTAINER = SoupStrainer(id="__next")
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+# Último recurso para las tallas: un texto que mencione la talla, en cualquier capitalización
+_SIZE_WORDS_RE = re.compile(r"talla|size", re.IGNORECASE)
+
+EXCLUDED_IMAGE_WORDS = ("icon", "logo", "banner")
+CURRENCY_MARKERS = ("$", "€", "S/", "£")
+MAX_IMAGES = 6
+
+
+def parse_product_html(html):
+    """Parse only the product container with lxml and return (soup, page_title)."""
+    match = _TITLE_RE.search(html)
+    page_title = match.group(1).strip() if match else None
+
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=PRODUCT_CONTAINER)
+    if not soup.find(True):
+        # Página sin contenedor de Next.js: analizar el documento completo
+        soup = BeautifulSoup(html, HTML_PARSER)
+    return soup, page_title
+
+
+def _target_tags(selector):
+    """Tag names the rightmost compound of `selector` can match, or None for any tag."""
+    names = set()
+    for part in selector.split(","):
+        last = re.split(r"[\s>+~]+", part.strip())[-1]
+        match = re.match(r"[a-zA-Z][a-zA-Z0-9]*", last)
+        if not match:
+            return None
+        names.add(match.group(0).lower())
+    return names
+
+
+def _text(tag):
+    return tag.get_text().strip() or None
+
+
+def _long_text(tag):
+    text = tag.get_text().strip()
+    return text if len(text) > 20 else None
+
+
+def _price_text(tag):
+    text = tag.get_text().strip()
+    if text and (any(marker in text for marker in CURRENCY_MARKERS) or any(char.isdigit() for char in text)):
+        return text
+    return None
+
+
+def _image_src(tag):
+    src = tag.get("src")
+    if not src or any(excluded in src.lower() for excluded in EXCLUDED_IMAGE_WORDS):
+        return None
+    # Convertir de baja a alta resolución
+    return src.replace("w=100,h=100", "w=500,h=500")
+
+
+def _srcset_2x(tag):
+    urls = []
+    for url_part in tag.get("srcset", "").split(","):
+        url_part = url_part.strip()
+        if "2x" in url_part and "/w=200,h=200" in url_part:  # Imágenes de mayor resolución
+            urls.append(url_part.split(" ")[0].replace("w=200,h=200", "w=500,h=500"))
+    return urls or None
+
+
+def size_hint(soup):
+    """Text of the first element (outside scripts and styles) that mentions a size.
+
+    Last resort for available_sizes once every tier, the live DOM included, found no size buttons:
+    it also matches texts like "Guía de tallas".
+    """
+    for text in soup.find_all(string=_SIZE_WORDS_RE):
+        parent = text.parent
+        if parent is None or parent.name in ("script", "style"):
+            continue
+        size_info = parent.get_text().strip()
+        if size_info:
+            return size_info
+    return None
+
+
+def _spec_pairs(tag):
+    pairs = {}
+    if tag.name == "table":
+        for row in tag.find_all("tr"):
+            cells = row.find_all("td")
+            if len(cells) >= 2:
+                pairs[cells[0].get_text().strip()] = cells[1].get_text().strip()
+    else:
+        for key_elem in tag.find_all(["dt", "h3", "strong"]):
+            value_elem = key_elem.find_next(["dd", "p", "span", "div"])
+            if value_elem:
+                pairs[key_elem.get_text().strip()] = value_elem.get_text().strip()
+    return pairs or None
+
+
+class FieldRule:
+    """A field, its selectors in priority order (compiled once) and how to read a match."""
+
+    def __init__(self, name, selectors, extract, many=False, serves=None):
+        self.name = name
+        # Reglas auxiliares (p. ej. srcset) se ejecutan cuando se pide el campo al que sirven
+        self.serves = serves or name
+        self.selectors = selectors
+        self.compiled = [sv.compile(selector) for selector in selectors]
+        # Filtro barato por nombre de etiqueta antes de evaluar el selector completo
+        self.target_tags = [_target_tags(selector) for selector in selectors]
+        self.extract = extract
+        # many=True junta los valores de todas las coincidencias del mejor selector
+        self.many = many
+
+
+class ExtractionPlan:
+    """Resolve every field in a single traversal of the parsed product container."""
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    @staticmethod
+    def _merge(current, value):
+        if current is None:
+            return value if not isinstance(value, str) else [value]
+        if isinstance(value, dict):
+            current.update(value)
+        else:
+            for item in value if isinstance(value, list) else [value]:
+                if item not in current:
+                    current.append(item)
+        return current
+
+    def run(self, soup, page_title=None, fields=None):
+        """Return the extracted fields; `fields` limits the plan to a subset of rules."""
+        start = time.perf_counter()
+        rules = [rule for rule in self.rules if fields is None or rule.serves in fields]
+        # Índice del mejor selector con valor encontrado hasta ahora por campo
+        best = {rule.name: len(rule.selectors) for rule in rules}
+        found = {rule.name: {} for rule in rules}
+
+        for tag in soup.descendants:
+            if not isinstance(tag, Tag):
+                continue
+            for rule in rules:
+                # Los selectores de menor prioridad que uno ya resuelto no se evalúan
+                upper = min(best[rule.name] + 1, len(rule.selectors)) if rule.many else best[rule.name]
+                for index in range(upper):
+                    target_tags = rule.target_tags[index]
+                    if target_tags is not None and tag.name not in target_tags:
+                        continue
+                    if not rule.compiled[index].match(tag):
+                        continue
+                    value = rule.extract(tag)
+                    if value:
+                        if rule.many:
+                            found[rule.name][index] = self._merge(found[rule.name].get(index), value)
+                        elif index not in found[rule.name]:
+                            found[rule.name][index] = value
+                        best[rule.name] = min(best[rule.name], index)
+                    break
+
+        values = {name: by_index[min(by_index)] for name, by_index in found.items() if by_index}
+        values = self._finalize(values, page_title, fields)
+        logger.info(f"Plan de extracción ejecutado en {(time.perf_counter() - start) * 1000:.1f} ms")
+        return values
+
+    @staticmethod
+    def _finalize(values, page_title, fields):
+        """Apply the cross-field fallbacks the old per-field extractors used."""
+        wanted = (lambda name: fields is None or name in fields)
+
+        # Normalmente el título contiene el nombre del producto seguido por el nombre de la tienda
+        if wanted("title") and "title" not in values and page_title and " - " in page_title:
+            values["title"] = page_title.split(" - ")[0].strip()
+
+        # Completar con las versiones 2x de srcset cuando hay pocas imágenes
+        srcset_links = values.pop("image_srcset", None) or []
+        image_links = values.get("image_links", [])
+        if len(image_links) < 4:
+            for url in srcset_links:
+                if url not in image_links:
+                    image_links.append(url)
+        if image_links:
+            values["image_links"] = image_links[:MAX_IMAGES]
+
+        if wanted("additional_info") and "additional_info" not in values and values.get("specifications"):
+            values["additional_info"] = ", ".join(f"{k}: {v}" for k, v in values["specifications"].items())
+
+        return values
+
+
+PRODUCT_PLAN = ExtractionPlan([
+    FieldRule("title", [
+        "h1.product-name",
+        "h1[data-name]",
+        "div.product-name h1",
+        ".product-detail h1",
+        "h1.jsx-1794488219",
+        "h1[class*='title']",
+        "h1[class*='name']",
+        "h1",
+    ], _text),
+    FieldRule("price", [
+        "span.copy17.primary.senary.jsx-2835692965.bold",
+        "span.copy12.primary.senary.jsx-2835692965.bold",
+        "span[data-testid='product-price']",
+        ".price-main",
+        ".product-price",
+        "div[class*='price']",
+        "span[class*='price']",
+        "span.primary.senary.bold, span[data-testid*='price']",
+    ], _price_text),
+    FieldRule("available_sizes", [
+        "div.size-options button",
+        "button[class*='size-button']",
+        "button[id^='testId-sizeButton-']",
+        "div[class*='size'] button",
+        "div[class*='variante'] button",
+        "div.jsx-2889528833 button",  # Selector específico observado en Falabella
+        "button[class*='size']",
+    ], _text, many=True),
+    FieldRule("image_links", [
+        "div.jsx-733916836.carousel img",
+        "img[id^='testId-pod-image']",
+        "div[class*='carousel'] img",
+        "div[class*='gallery'] img",
+        "img[class*='product']",
+        "img[src*='product']",
+    ], _image_src, many=True),
+    FieldRule("image_srcset", ["img[srcset]"], _srcset_2x, many=True, serves="image_links"),
+    FieldRule("specifications", [
+        "table[class*='specification']",
+        "table[class*='spec']",
+        "div[class*='specification']",
+        "div[class*='spec']",
+        "div[class*='details']",
+    ], _spec_pairs, many=True),
+    FieldRule("additional_info", [
+        "div[class*='product-information']",
+        "div[class*='product-detail']",
+        "div[class*='description']",
+        "div[id*='description']",
+        "p[class*='description']",
+    ], _long_text),
+])
@@ -0,0 +1,325 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from groq import RateLimitError
+from src.hedging import HedgeAbandoned
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Estimación previa a la llamada; la diferencia con el uso real se ajusta al terminar
+CHARS_PER_TOKEN = 4
+# Tokens que se reservan por imagen enviada al modelo de visión
+IMAGE_TOKENS = 1024
+LANES = ("interactive", "batch")
+
+_lane = contextvars.ContextVar("groq_lane", default="interactive")
+
+
+@contextmanager
+def lane(name):
+    """Run the Groq calls made inside the block (and in contexts copied from it) in a priority lane."""
+    if name not in LANES:
+        raise ValueError(f"Carril de prioridad no soportado: {name}")
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane():
+    return _lane.get()
+
+
+def estimate_tokens(text, max_tokens=0, images=0):
+    """Tokens a call may consume: prompt estimated from its length plus the completion budget."""
+    return len(text) // CHARS_PER_TOKEN + (max_tokens or 0) + images * IMAGE_TOKENS
+
+
+def estimate_request_tokens(request):
+    """estimate_tokens() for the keyword arguments of a chat completion."""
+    text, images = [], 0
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            text.append(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                text.append(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                images += 1
+    return estimate_tokens("".join(text), request.get("max_tokens"), images)
+
+
+def usage_of(response):
+    """Total tokens reported by a LangChain message or a Groq completion, or None."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        return token_usage.get("total_tokens")
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def served_by(response):
+    """Model name reported by a LangChain message or a Groq completion, or None."""
+    metadata = getattr(response, "response_metadata", None) or {}
+    return metadata.get("model_name") or getattr(response, "model", None)
+
+
+def parse_limits(spec):
+    """Parse "model=rpm/tpm,model=rpm/tpm" into {model: (rpm, tpm)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, quota = item.rpartition("=")
+        rpm, _, tpm = quota.partition("/")
+        limits[model] = (int(rpm), int(tpm))
+    return limits
+
+
+class TokenBucket:
+    """Budget refilled continuously up to `capacity`; goes negative when real usage beats the estimate."""
+
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.per_second)
+        self._updated = now
+
+    def wait_time(self, amount, now, reserve=0.0):
+        """Seconds until `amount` can be taken while leaving `reserve` in the bucket."""
+        self._refill(now)
+        needed = min(amount + reserve, self.capacity)
+        return max(needed - self.level, 0) / self.per_second
+
+    def take(self, amount):
+        self.level -= amount
+
+    def give(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _ModelQuota:
+    def __init__(self, rpm, tpm, headroom):
+        self.rpm = rpm
+        self.tpm = tpm
+        # Apuntar justo por debajo de la cuota: los contadores de Groq no están sincronizados con los nuestros
+        self.requests = TokenBucket(rpm * headroom, rpm * headroom / 60)
+        self.tokens = TokenBucket(tpm * headroom, tpm * headroom / 60)
+        self.blocked_until = 0.0
+        self.calls = {name: 0 for name in LANES}
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rate_limited = 0
+        self.failed = 0
+
+
+class GroqScheduler:
+    """Pace Groq calls per model under its RPM/TPM quota, interactive lane first, retrying 429s.
+
+    Batch calls only draw from the buckets while `batch_reserve` of them stays free, so a batch
+    never starves interactive requests. A 429 pauses every caller of that model for the
+    `retry-after` the API asked for, plus jitter so waiters do not return in lockstep.
+    """
+
+    def __init__(self, limits=None, headroom=None, batch_reserve=None, max_retries=None, backoff_base=None):
+        self.limits = limits if limits is not None else parse_limits(os.getenv(
+            "GROQ_RATE_LIMITS",
+            "gemma2-9b-it=30/15000,meta-llama/llama-4-scout-17b-16e-instruct=30/30000",
+        ))
+        self.default_limit = (int(os.getenv("GROQ_DEFAULT_RPM", "30")), int(os.getenv("GROQ_DEFAULT_TPM", "6000")))
+        self.headroom = headroom or float(os.getenv("GROQ_QUOTA_HEADROOM", "0.9"))
+        self.batch_reserve = batch_reserve if batch_reserve is not None else float(
+            os.getenv("GROQ_BATCH_RESERVE", "0.2"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GROQ_MAX_RETRIES", "4"))
+        self.backoff_base = backoff_base or float(os.getenv("GROQ_BACKOFF_BASE", "1.0"))
+        self._lock = threading.Lock()
+        self._quotas = {}
+
+    def _quota(self, model):
+        quota = self._quotas.get(model)
+        if quota is None:
+            rpm, tpm = self.limits.get(model, self.default_limit)
+            quota = self._quotas[model] = _ModelQuota(rpm, tpm, self.headroom)
+        return quota
+
+    def _try_acquire(self, model, tokens, lane_name):
+        """Take one request and `tokens` from the model's buckets; return 0 or the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            quota = self._quota(model)
+            if quota.blocked_until > now:
+                return quota.blocked_until - now
+            reserve = self.batch_reserve if lane_name == "batch" else 0.0
+            wait = max(
+                quota.requests.wait_time(1, now, reserve * quota.requests.capacity),
+                quota.tokens.wait_time(tokens, now, reserve * quota.tokens.capacity),
+            )
+            if wait > 0:
+                return wait
+            quota.requests.take(1)
+            quota.tokens.take(tokens)
+            return 0
+
+    def _acquired(self, model, lane_name, waited):
+        with self._lock:
+            quota = self._quota(model)
+            quota.calls[lane_name] += 1
+            quota.total_wait += waited
+            quota.max_wait = max(quota.max_wait, waited)
+
+    def acquire(self, model, tokens, lane_name=None):
+        """Block until the call fits in the model's quota."""
+        lane_name = lane_name or current_lane()
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(model, tokens, lane_name)
+            if not wait:
+                break
+            time.sleep(wait + random.uniform(0, 0.05))
+        self._acquired(model, lane_name, time.monotonic() - start)
+
+    async def aacquire(self, model, tokens, lane_name=None):
+        """Async version of acquire(); waiting does not block the event loop."""
+        lane_name = lane_name or current_lane()
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(model, tokens, lane_name)
+            if not wait:
+                break
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+        self._acquired(model, lane_name, time.monotonic() - start)
+
+    def settle(self, model, reserved, used):
+        """Correct the token bucket with the real usage of a finished call (None leaves the estimate)."""
+        if used is None:
+            return
+        with self._lock:
+            quota = self._quota(model)
+            if used < reserved:
+                quota.tokens.give(reserved - used)
+            else:
+                quota.tokens.take(used - reserved)
+
+    def release(self, model, tokens):
+        """Give back the reservation of a call that was never sent."""
+        with self._lock:
+            quota = self._quota(model)
+            quota.requests.give(1)
+            quota.tokens.give(tokens)
+
+    def _settle_response(self, model, tokens, response):
+        # Un respaldo de otro modelo ya se ajustó en su propia llamada: su uso no es de este modelo
+        if served_by(response) in (None, model):
+            self.settle(model, tokens, usage_of(response))
+
+    def _backoff(self, model, error, attempt):
+        """Pause the model for retry-after (or exponential backoff) with jitter; return the delay."""
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        delay = retry_after if retry_after is not None else self.backoff_base * 2 ** attempt
+        delay *= 1 + random.uniform(0, 0.25)
+        with self._lock:
+            quota = self._quota(model)
+            quota.rate_limited += 1
+            # Todos los llamadores del modelo esperan: reintentar antes solo produce más 429
+            quota.blocked_until = max(quota.blocked_until, time.monotonic() + delay)
+        logger.warning(f"Límite de Groq alcanzado para {model}; reintento {attempt + 1} en {delay:.1f} s")
+        return delay
+
+    def _give_up(self, model):
+        with self._lock:
+            self._quota(model).failed += 1
+
+    def call(self, model, fn, tokens, lane_name=None):
+        """Run fn() within the model's quota, retrying rate-limit errors; return its response."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model, tokens, lane_name)
+            try:
+                response = fn()
+            except HedgeAbandoned:
+                self.release(model, tokens)
+                raise
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    self._give_up(model)
+                    raise
+                time.sleep(self._backoff(model, e, attempt))
+                continue
+            self._settle_response(model, tokens, response)
+            return response
+
+    async def acall(self, model, coro_fn, tokens, lane_name=None):
+        """Async version of call(): await coro_fn() within the model's quota."""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(model, tokens, lane_name)
+            try:
+                response = await coro_fn()
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    self._give_up(model)
+                    raise
+                await asyncio.sleep(self._backoff(model, e, attempt))
+                continue
+            self._settle_response(model, tokens, response)
+            return response
+
+    def stats(self):
+        """Per-model quota, current bucket levels, calls per lane, queueing time and 429s."""
+        now = time.monotonic()
+        with self._lock:
+            models = {}
+            for model, quota in self._quotas.items():
+                quota.requests.wait_time(0, now)
+                quota.tokens.wait_time(0, now)
+                calls = sum(quota.calls.values())
+                models[model] = {
+                    "rpm": quota.rpm,
+                    "tpm": quota.tpm,
+                    "available_requests": round(quota.requests.level, 1),
+                    "available_tokens": round(quota.tokens.level),
+                    "paused_seconds": round(max(quota.blocked_until - now, 0), 1),
+                    "calls": dict(quota.calls),
+                    "avg_wait_seconds": round(quota.total_wait / calls, 3) if calls else 0.0,
+                    "max_wait_seconds": round(quota.max_wait, 3),
+                    "rate_limited": quota.rate_limited,
+                    "failed": quota.failed,
+                }
+            return {"headroom": self.headroom, "batch_reserve": self.batch_reserve, "models": models}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide Groq scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GroqScheduler()
+        return _scheduler
@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+
+class HedgeAbandoned(Exception):
+    """Raised by a backup call that is no longer needed, before its request is sent."""
+
+
+def raise_if_abandoned(abandoned):
+    """Stop a synchronous backup once the call it was covering has answered."""
+    if abandoned is not None and abandoned.is_set():
+        raise HedgeAbandoned()
+
+
+class HedgeBudget:
+    """Extra calls that hedging may still fire for one API request."""
+
+    def __init__(self, limit):
+        self.remaining = limit
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+_budget = contextvars.ContextVar("hedge_budget", default=None)
+
+
+@contextmanager
+def hedge_budget(limit=None):
+    """Cap the hedges fired inside the block (one API request) at HEDGE_MAX_PER_REQUEST."""
+    limit = limit if limit is not None else int(os.getenv("HEDGE_MAX_PER_REQUEST", "2"))
+    token = _budget.set(HedgeBudget(limit))
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def _take_budget():
+    # Fuera de una solicitud (benchmarks, scripts) cada llamada puede cubrirse una vez
+    budget = _budget.get()
+    return budget is None or budget.take()
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_hedge_executor():
+    """Return the threads that run hedged synchronous calls (HEDGE_WORKERS)."""
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            workers = int(os.getenv("HEDGE_WORKERS", "16"))
+            _hedge_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        return _hedge_executor
+
+
+class Hedger:
+    """Fire a backup call when the first one outlives the recent latency percentile; keep the first to finish.
+
+    The threshold is HEDGE_PERCENTILE of the last HEDGE_WINDOW call latencies, never below
+    HEDGE_MIN_DELAY; until HEDGE_MIN_SAMPLES calls are known, HEDGE_INITIAL_DELAY is used.
+    """
+
+    def __init__(self, name, percentile=None, window=None, min_samples=None, min_delay=None, initial_delay=None):
+        self.name = name
+        self.enabled = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+        self.percentile = percentile or float(os.getenv("HEDGE_PERCENTILE", "95"))
+        self.min_samples = min_samples or int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+        self.initial_delay = initial_delay or float(os.getenv("HEDGE_INITIAL_DELAY", "10"))
+        self._latencies = deque(maxlen=window or int(os.getenv("HEDGE_WINDOW", "200")))
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._primary_wins = 0
+        self._budget_exhausted = 0
+        self._censored = 0
+
+    def threshold(self):
+        """Seconds to wait for the primary call before hedging."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(samples[index], self.min_delay)
+
+    def _record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _timed(self, fn):
+        start = time.monotonic()
+        result = fn()
+        self._record(time.monotonic() - start)
+        return result
+
+    async def _atimed(self, coro_fn):
+        start = time.monotonic()
+        result = await coro_fn()
+        self._record(time.monotonic() - start)
+        return result
+
+    def _won(self, winner, backup):
+        self._count("_hedge_wins" if winner is backup else "_primary_wins")
+        if winner is backup:
+            logger.info(f"La llamada de respaldo ({self.name}) terminó antes que la original")
+
+    def call(self, primary, hedge):
+        """Run primary(); if it is slower than the threshold, also run hedge(abandoned) and return the first result.
+
+        A synchronous loser cannot be interrupted once its request is sent: it finishes in the
+        background and is discarded. `abandoned` is set as soon as the result is known, so a backup
+        still queued for quota or a slot checks it with raise_if_abandoned() and never sends.
+        """
+        self._count("_calls")
+        if not self.enabled:
+            return self._timed(primary)
+        executor = get_hedge_executor()
+        first = executor.submit(contextvars.copy_context().run, self._timed, primary)
+        done, _ = wait([first], timeout=self.threshold())
+        if done:
+            return first.result()
+        if not _take_budget():
+            self._count("_budget_exhausted")
+            return first.result()
+
+        self._count("_hedged")
+        logger.info(f"Llamada {self.name} más lenta que el umbral, lanzando respaldo")
+        abandoned = threading.Event()
+        backup = executor.submit(contextvars.copy_context().run, self._timed, lambda: hedge(abandoned))
+        pending = {first, backup}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for loser in pending:
+                            loser.cancel()
+                        self._won(future, backup)
+                        return future.result()
+            # Ambas fallaron: propagar el error de la llamada original
+            return first.result()
+        finally:
+            abandoned.set()
+
+    async def acall(self, primary, hedge):
+        """Async version of call(); the losing call is cancelled and its elapsed time kept as a sample."""
+        self._count("_calls")
+        if not self.enabled:
+            return await self._atimed(primary)
+        first = asyncio.ensure_future(self._atimed(primary))
+        tasks = [first]
+        started = {first: time.monotonic()}
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.threshold())
+            if done:
+                return first.result()
+            if not _take_budget():
+                self._count("_budget_exhausted")
+                return await first
+
+            self._count("_hedged")
+            logger.info(f"Llamada {self.name} más lenta que el umbral, lanzando respaldo")
+            backup = asyncio.ensure_future(self._atimed(hedge))
+            tasks.append(backup)
+            started[backup] = time.monotonic()
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(task, backup)
+                        return task.result()
+            return first.result()
+        finally:
+            now = time.monotonic()
+            for task in tasks:
+                if task.done():
+                    continue
+                task.cancel()
+                # Muestra censurada: la llamada cancelada habría tardado al menos esto; omitirla
+                # dejaría en la ventana solo las llamadas rápidas y bajaría el umbral
+                self._record(now - started[task])
+                self._count("_censored")
+
+    def stats(self):
+        """Return the current threshold and how often hedges fired and won."""
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold_seconds": round(threshold, 2),
+                "samples": len(self._latencies),
+                "calls": self._calls,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "primary_wins": self._primary_wins,
+                "hedge_win_ratio": round(self._hedge_wins / self._hedged, 3) if self._hedged else 0.0,
+                "budget_exhausted": self._budget_exhausted,
+                "censored_samples": self._censored,
+            }
+
+
+_hedgers = {}
+_hedgers_lock = threading.Lock()
+
+
+def get_hedger(name):
+    """Return the process-wide hedger for a kind of call ("llm", "vision")."""
+    with _hedgers_lock:
+        if name not in _hedgers:
+            _hedgers[name] = Hedger(name)
+        return _hedgers[name]
+
+
+def hedging_stats():
+    """Stats of every hedger created so far."""
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {name: hedger.stats() for name, hedger in hedgers.items()}
@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from PIL import Image
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CachedTile:
+    """A cached, pre-resized product image plus the HTTP validators it was stored with."""
+
+    def __init__(self, key, meta, image, size):
+        self.key = key
+        self.meta = meta
+        self.image = image
+        self.size = size
+
+    @property
+    def fresh(self):
+        return time.time() < self.meta.get("expires_at", 0)
+
+    def conditional_headers(self):
+        """Headers for a conditional GET that revalidates this entry."""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+
+class ImageCache:
+    """Size-capped LRU cache on disk of resized product images, keyed by URL and tile size."""
+
+    def __init__(self, directory=None, max_bytes=None, default_ttl=None):
+        self.directory = directory or os.getenv("IMAGE_CACHE_DIR", ".cache/images")
+        self.max_bytes = max_bytes or int(float(os.getenv("IMAGE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+        self.default_ttl = default_ttl or int(os.getenv("IMAGE_CACHE_DEFAULT_TTL", "86400"))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> tamaño en bytes, del menos al más reciente
+        self._total_bytes = 0
+        self._hits = 0
+        self._stale = 0
+        self._revalidated = 0
+        self._misses = 0
+        self._bytes_served = 0
+        self._evictions = 0
+        self._load_index()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".jpg", base + ".json"
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files left by previous runs (mtime = last access)."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            image_path, meta_path = self._paths(key)
+            try:
+                found.append((os.path.getmtime(meta_path), key, os.path.getsize(image_path)))
+            except OSError:
+                continue
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        if found:
+            logger.info(f"Caché de imágenes cargada: {len(found)} entradas, {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    @staticmethod
+    def make_key(url, img_size):
+        return hashlib.sha256(f"{url}|{img_size[0]}x{img_size[1]}".encode("utf-8")).hexdigest()
+
+    def _expiry(self, headers):
+        """Expiry timestamp from Cache-Control/Expires, or None when the response must not be stored."""
+        cache_control = (headers.get("Cache-Control") or "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return time.time()  # Guardar, pero revalidar siempre antes de usar
+        match = _MAX_AGE_RE.search(cache_control)
+        if match:
+            return time.time() + int(match.group(1))
+        if headers.get("Expires"):
+            try:
+                return parsedate_to_datetime(headers["Expires"]).timestamp()
+            except (TypeError, ValueError):
+                pass
+        return time.time() + self.default_ttl
+
+    def lookup(self, url, img_size):
+        """Return the cached tile for `url` (fresh or stale), or None."""
+        key = self.make_key(url, img_size)
+        image_path, meta_path = self._paths(key)
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(image_path, "rb") as f:
+                data = f.read()
+            image = Image.open(BytesIO(data))
+            image.load()
+            os.utime(meta_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché corrupta, descartándola: {e}")
+            self._remove(key)
+            with self._lock:
+                self._misses += 1
+            return None
+
+        entry = CachedTile(key, meta, image, len(data))
+        with self._lock:
+            if entry.fresh:
+                self._hits += 1
+                self._bytes_served += entry.size
+            elif entry.conditional_headers():
+                # Vencida pero revalidable con una petición condicional
+                self._stale += 1
+            else:
+                # Vencida y sin validadores: equivale a no tenerla
+                self._misses += 1
+                return None
+        return entry
+
+    def store(self, url, img_size, image, headers):
+        """Save a resized tile with the caching metadata from the HTTP response."""
+        expires_at = self._expiry(headers)
+        if expires_at is None:
+            return
+        key = self.make_key(url, img_size)
+        image_path, meta_path = self._paths(key)
+        meta = {
+            "url": url,
+            "expires_at": expires_at,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=95)
+        try:
+            with open(image_path, "wb") as f:
+                f.write(buffer.getbuffer())
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la imagen en caché: {e}")
+            return
+
+        size = buffer.tell()
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict()
+
+    def revalidated(self, entry, headers):
+        """Refresh a stale entry after a 304 Not Modified answer."""
+        expires_at = self._expiry(headers)
+        if expires_at is None:
+            self._remove(entry.key)
+            return
+        entry.meta["expires_at"] = expires_at
+        entry.meta["etag"] = headers.get("ETag") or entry.meta.get("etag")
+        entry.meta["last_modified"] = headers.get("Last-Modified") or entry.meta.get("last_modified")
+        _, meta_path = self._paths(entry.key)
+        try:
+            with open(meta_path, "w") as f:
+                json.dump(entry.meta, f)
+        except OSError as e:
+            logger.warning(f"No se pudo actualizar la entrada de caché: {e}")
+        with self._lock:
+            self._revalidated += 1
+            self._bytes_served += entry.size
+
+    def _remove(self, key):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key = next(iter(self._entries))
+                self._evictions += 1
+            self._remove(key)
+
+    def stats(self):
+        """Return hit/miss counters and disk usage."""
+        with self._lock:
+            lookups = self._hits + self._stale + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "stale": self._stale,
+                "revalidated": self._revalidated,
+                "misses": self._misses,
+                "hit_ratio": round((self._hits + self._revalidated) / lookups, 3) if lookups else 0.0,
+                "bytes_served": self._bytes_served,
+                "evictions": self._evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Return the process-wide image cache, or None when disabled via IMAGE_CACHE_ENABLED."""
+    global _cache
+    if os.getenv("IMAGE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageCache()
+        return _cache
@@ -1,12 +1,27 @@
 import os
-import base64
+import time
+import asyncio
+import binascii
+import httpx
 import requests
 import math
 import logging
+import threading
 from io import BytesIO
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from PIL import Image
 from dotenv import load_dotenv
-from src.llm import GroqModelHandler
+from src.registry import get_registry
+from src.image_cache import get_image_cache
+from src.description_cache import get_description_cache
+from src.perceptual_hash import dhash
+from src.image_selection import ImageSelector
+from src.concurrency import get_limiter
+from src.groq_scheduler import get_scheduler, estimate_request_tokens
+from src.hedging import get_hedger, raise_if_abandoned
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -16,10 +31,262 @@ logger = logging.getLogger(__name__)
 # Cargar variables del archivo .env
 load_dotenv()
 
+_image_session = None
+_image_executor = None
+_describe_executor = None
+_async_image_client = None
+_host_semaphores = {}
+_image_lock = threading.Lock()
+
+
+class _PoolTimeoutMixin:
+    """Wait for a free pooled connection no longer than the request's own timeout."""
+
+    def urlopen(self, method, url, *args, **kwargs):
+        # requests no pasa pool_timeout: con pool_block, un hilo esperaría un cupo para siempre
+        if kwargs.get("pool_timeout") is None:
+            timeout = kwargs.get("timeout")
+            kwargs["pool_timeout"] = getattr(timeout, "connect_timeout", None) or float(
+                os.getenv("IMAGE_GRID_DEADLINE", "8"))
+        return super().urlopen(method, url, *args, **kwargs)
+
+
+class _BoundedHTTPConnectionPool(_PoolTimeoutMixin, HTTPConnectionPool):
+    pass
+
+
+class _BoundedHTTPSConnectionPool(_PoolTimeoutMixin, HTTPSConnectionPool):
+    pass
+
+
+class BoundedPoolAdapter(HTTPAdapter):
+    """HTTPAdapter whose blocking pools give up (EmptyPoolError) once the request timeout passes."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _BoundedHTTPConnectionPool,
+            "https": _BoundedHTTPSConnectionPool,
+        }
+
+
+def get_image_session():
+    """Return the shared keep-alive session used for product image downloads."""
+    global _image_session
+    with _image_lock:
+        if _image_session is None:
+            per_host = int(os.getenv("IMAGE_FETCH_PER_HOST", "4"))
+            session = requests.Session()
+            # pool_block limita las conexiones simultáneas por host del CDN; la espera por un cupo
+            # no pasa del timeout de la descarga (el plazo de la cuadrícula)
+            adapter = BoundedPoolAdapter(pool_connections=8, pool_maxsize=per_host, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _image_session = session
+        return _image_session
+
+
+def get_image_executor():
+    """Return the shared thread pool for image downloads.
+
+    It is process-wide so downloads abandoned at the grid deadline finish in the
+    background instead of blocking the request that gave up on them.
+    """
+    global _image_executor
+    with _image_lock:
+        if _image_executor is None:
+            workers = int(os.getenv("IMAGE_FETCH_WORKERS", "8"))
+            _image_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-fetch")
+        return _image_executor
+
+
+def get_async_image_client():
+    """Return the shared async HTTP client for image downloads from coroutines."""
+    global _async_image_client
+    with _image_lock:
+        if _async_image_client is None:
+            workers = int(os.getenv("IMAGE_FETCH_WORKERS", "8"))
+            _async_image_client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers),
+            )
+        return _async_image_client
+
+
+def _host_semaphore(url):
+    """Per-host cap on concurrent async downloads, mirroring IMAGE_FETCH_PER_HOST."""
+    host = urlsplit(url).netloc
+    with _image_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = asyncio.Semaphore(int(os.getenv("IMAGE_FETCH_PER_HOST", "4")))
+        return _host_semaphores[host]
+
+
+async def close_async_image_client():
+    """Close the async download client (called at application shutdown)."""
+    global _async_image_client
+    with _image_lock:
+        client, _async_image_client = _async_image_client, None
+        _host_semaphores.clear()
+    if client is not None:
+        await client.aclose()
+
+
+def get_describe_executor():
+    """Return the thread pool that runs whole grid descriptions (download + vision call).
+
+    Kept apart from the download pool because each description itself waits on downloads.
+    """
+    global _describe_executor
+    with _image_lock:
+        if _describe_executor is None:
+            workers = int(os.getenv("IMAGE_DESCRIBE_WORKERS", "4"))
+            _describe_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-describe")
+        return _describe_executor
+
+
+def decode_tile(data, img_size):
+    """Decode image bytes straight to roughly `img_size` and return an RGB tile of that size."""
+    img = Image.open(BytesIO(data))
+    # En JPEG, draft() hace que el decodificador reduzca la escala (1/2, 1/4, 1/8) al leer
+    img.draft("RGB", img_size)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    # reducing_gap aplica reduce() entero antes del remuestreo para formatos sin draft
+    return img.resize(img_size, reducing_gap=3.0)
+
+
+def build_grid(tiles, img_size):
+    """Paste tiles, in order, into one grid allocated up front."""
+    n_images = len(tiles)
+    cols = math.ceil(math.sqrt(n_images))
+    rows = math.ceil(n_images / cols)
+    
+    logger.info(f"Creando cuadrícula de {rows}x{cols} para {n_images} imágenes")
+    grid_img = Image.new('RGB', (cols * img_size[0], rows * img_size[1]), color='white')
+    for i, tile in enumerate(tiles):
+        grid_img.paste(tile, ((i % cols) * img_size[0], (i // cols) * img_size[1]))
+    return grid_img
+
+
+class _Base64Writer:
+    """File-like sink that base64-encodes bytes as the JPEG encoder writes them."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pending = b""
+        self.raw_bytes = 0
+
+    def write(self, data):
+        self.raw_bytes += len(data)
+        data = self._pending + bytes(data)
+        # Codificar solo múltiplos de 3 bytes para que los fragmentos concatenen bien
+        cut = len(data) - len(data) % 3
+        if cut:
+            self._chunks.append(binascii.b2a_base64(data[:cut], newline=False))
+        self._pending = data[cut:]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        tail = binascii.b2a_base64(self._pending, newline=False) if self._pending else b""
+        return (b"".join(self._chunks) + tail).decode("ascii")
+
+
+class _ByteCounter:
+    """File-like sink that only counts bytes, used to size trial encodes."""
+
+    def __init__(self):
+        self.raw_bytes = 0
+
+    def write(self, data):
+        self.raw_bytes += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+# Ajustes JPEG para el payload de visión: progresivo y con tablas Huffman optimizadas
+JPEG_SETTINGS = {"format": "JPEG", "optimize": True, "progressive": True}
+QUALITY_STEPS = (90, 85, 80, 75, 70, 65, 60, 55, 50)
+SCALE_STEPS = (1.0, 0.85, 0.7, 0.55)
+
+
+def _jpeg_size(image, quality):
+    counter = _ByteCounter()
+    image.save(counter, quality=quality, **JPEG_SETTINGS)
+    return counter.raw_bytes
+
+
+def encode_within_budget(image, max_bytes):
+    """Encode `image` as base64 JPEG at the best quality/resolution that fits in `max_bytes`.
+
+    Resolution is only reduced once even the lowest quality step is over budget.
+    Returns (base64 string, report dict).
+    """
+    start = time.monotonic()
+    attempts = 0
+    chosen = None
+    for scale in SCALE_STEPS:
+        if scale == 1.0:
+            candidate = image
+        else:
+            size = (round(image.width * scale), round(image.height * scale))
+            candidate = image.resize(size, reducing_gap=2.0)
+        
+        # Lo habitual es que la calidad máxima ya quepa; si no, búsqueda binaria en el resto
+        attempts += 1
+        if _jpeg_size(candidate, QUALITY_STEPS[0]) <= max_bytes:
+            best = QUALITY_STEPS[0]
+        elif _jpeg_size(candidate, QUALITY_STEPS[-1]) > max_bytes:
+            # Ni la calidad mínima cabe a esta resolución: pasar a la siguiente escala
+            attempts += 1
+            best = None
+        else:
+            attempts += 1
+            best = QUALITY_STEPS[-1]
+            low, high = 1, len(QUALITY_STEPS) - 2
+            while low <= high:
+                middle = (low + high) // 2
+                attempts += 1
+                if _jpeg_size(candidate, QUALITY_STEPS[middle]) <= max_bytes:
+                    best = QUALITY_STEPS[middle]
+                    high = middle - 1
+                else:
+                    low = middle + 1
+        if best is not None:
+            chosen = (candidate, best)
+            break
+    
+    if chosen is None:
+        # Ni la combinación más pequeña cabe: enviar la más pequeña igualmente
+        chosen = (candidate, QUALITY_STEPS[-1])
+    
+    candidate, quality = chosen
+    writer = _Base64Writer()
+    candidate.save(writer, quality=quality, **JPEG_SETTINGS)
+    report = {
+        "bytes": writer.raw_bytes,
+        "max_bytes": max_bytes,
+        "within_budget": writer.raw_bytes <= max_bytes,
+        "quality": quality,
+        "width": candidate.width,
+        "height": candidate.height,
+        "attempts": attempts,
+        "encode_seconds": round(time.monotonic() - start, 3),
+    }
+    return writer.getvalue(), report
+
+
 class ImageGridDescriber:
     def __init__(self):
-        # Initialize the GroqModelHandler client and load the vision model name
-        self.client = GroqModelHandler().get_client()
+        # Los clientes de Groq (y su pool de conexiones) son del proceso, no de cada scraping
+        registry = get_registry()
+        self.client = registry.client
+        self.async_client = registry.async_client
         
         # Get the vision model from environment variables with a clear fallback
         vision_model = os.getenv("VISION_MODEL_NAME")
@@ -28,128 +295,317 @@ class ImageGridDescriber:
             logger.warning(f"VISION_MODEL_NAME no encontrado en .env, usando modelo por defecto: {vision_model}")
         
         self.vision_model = vision_model
+        # Modelo al que van las llamadas de respaldo cuando la descripción tarda más de lo habitual
+        self.fallback_vision_model = os.getenv("FALLBACK_VISION_MODEL_NAME") or vision_model
+        self.fetch_timings = []
+        # Hashes perceptuales de las imágenes de la última cuadrícula, para la caché de descripciones
+        self.tile_hashes = []
+        self.selection_report = []
+        self.encode_report = {}
+        # True si la última descripción es el texto de error y no una respuesta del modelo
+        self.failed = False
         logger.info(f"Inicializado ImageGridDescriber con modelo: {self.vision_model}")
 
     @staticmethod
-    def encode_image(image: Image.Image) -> str:
-        """Encode an image to a base64 string."""
+    def encode_image(image: Image.Image, max_bytes=None) -> str:
+        """Encode an image to a base64 string within the vision payload byte budget."""
+        return ImageGridDescriber._encode(image, max_bytes)[0]
+
+    @staticmethod
+    def _encode(image, max_bytes=None):
+        max_bytes = max_bytes or int(float(os.getenv("VISION_PAYLOAD_MAX_KB", "96")) * 1024)
         try:
-            buffered = BytesIO()
-            # Save as JPEG with quality parameter to manage file size
-            image.save(buffered, format="JPEG", quality=85)
-            encoded_image = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            image_size_kb = len(encoded_image) * 3 / 4 / 1024  # Approximate size in KB
-            logger.info(f"Imagen codificada, tamaño aproximado: {image_size_kb:.2f} KB")
-            return encoded_image
+            # El JPEG final se codifica a base64 a medida que se escribe, sin buffer intermedio
+            encoded_image, report = encode_within_budget(image, max_bytes)
+            logger.info(
+                f"Imagen codificada: {report['bytes'] / 1024:.2f} KB de {max_bytes / 1024:.0f} KB, "
+                f"calidad {report['quality']}, {report['width']}x{report['height']}, "
+                f"{report['attempts']} intentos en {report['encode_seconds']}s"
+            )
+            return encoded_image, report
         except Exception as e:
             logger.error(f"Error al codificar imagen: {e}")
             raise
 
-    def concatenate_images_square(self, urls, img_size=(300, 300)):
+    def _fetch_image(self, url, img_size, timeout):
+        """Download one image (or reuse the cached tile) and return (image or None, timing dict)."""
+        start = time.monotonic()
+        timing = {"url": url, "ok": False}
+        cache = get_image_cache()
+        cached = cache.lookup(url, img_size) if cache else None
+        if cached is not None and cached.fresh:
+            timing.update(ok=True, cache="hit", download_seconds=round(time.monotonic() - start, 3))
+            return cached.image, timing
+        
+        try:
+            logger.info(f"Descargando imagen desde: {url[:60]}...")
+            headers = cached.conditional_headers() if cached else {}
+            response = get_image_session().get(url, headers=headers, timeout=timeout)
+            timing["download_seconds"] = round(time.monotonic() - start, 3)
+            timing["bytes"] = len(response.content)
+            
+            if response.status_code == 304 and cached is not None:
+                # El CDN confirma que la imagen no cambió: usar la copia local
+                cache.revalidated(cached, response.headers)
+                timing.update(ok=True, cache="revalidated")
+                return cached.image, timing
+            
+            if response.status_code != 200:
+                logger.warning(f"Error al descargar imagen. Código de estado: {response.status_code}")
+                return None, timing
+                
+            img = decode_tile(response.content, img_size)
+            timing.update(ok=True, cache="miss")
+            if cache:
+                cache.store(url, img_size, img, response.headers)
+            logger.info("Imagen procesada correctamente")
+            return img, timing
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error en la solicitud HTTP: {e}")
+        except Exception as e:
+            logger.error(f"Error al procesar la imagen {url[:60]}: {e}")
+        return None, timing
+
+    async def _afetch_image(self, url, img_size, timeout):
+        """Async version of _fetch_image; disk and decoding work run in worker threads."""
+        start = time.monotonic()
+        timing = {"url": url, "ok": False}
+        cache = get_image_cache()
+        cached = await asyncio.to_thread(cache.lookup, url, img_size) if cache else None
+        if cached is not None and cached.fresh:
+            timing.update(ok=True, cache="hit", download_seconds=round(time.monotonic() - start, 3))
+            return cached.image, timing
+        
+        try:
+            logger.info(f"Descargando imagen desde: {url[:60]}...")
+            headers = cached.conditional_headers() if cached else {}
+            async with _host_semaphore(url):
+                response = await get_async_image_client().get(url, headers=headers, timeout=timeout)
+            timing["download_seconds"] = round(time.monotonic() - start, 3)
+            timing["bytes"] = len(response.content)
+            
+            if response.status_code == 304 and cached is not None:
+                await asyncio.to_thread(cache.revalidated, cached, response.headers)
+                timing.update(ok=True, cache="revalidated")
+                return cached.image, timing
+            
+            if response.status_code != 200:
+                logger.warning(f"Error al descargar imagen. Código de estado: {response.status_code}")
+                return None, timing
+            
+            img = await asyncio.to_thread(decode_tile, response.content, img_size)
+            timing.update(ok=True, cache="miss")
+            if cache:
+                await asyncio.to_thread(cache.store, url, img_size, img, response.headers)
+            logger.info("Imagen procesada correctamente")
+            return img, timing
+        
+        except httpx.HTTPError as e:
+            logger.error(f"Error en la solicitud HTTP: {e}")
+        except Exception as e:
+            logger.error(f"Error al procesar la imagen {url[:60]}: {e}")
+        return None, timing
+        
+    def concatenate_images_square(self, urls, img_size=(300, 300), deadline=None):
         """Create a square grid from multiple product images."""
         if not urls:
             logger.warning("No hay URLs de imágenes para procesar")
             return None
             
         logger.info(f"Procesando {len(urls)} URLs de imágenes")
-        images = []
-        failed_urls = []
+        deadline = deadline or float(os.getenv("IMAGE_GRID_DEADLINE", "8"))
+        # Descargar algunas candidatas más de las que caben en la cuadrícula para poder elegir
+        urls = urls[:int(os.getenv("IMAGE_SELECTION_CANDIDATES", "6"))]
         
-        # Try to download and process each image
-        for url in urls[:4]:  # Limitar a 4 imágenes para una cuadrícula 2x2
-            try:
-                logger.info(f"Descargando imagen desde: {url[:60]}...")
-                response = requests.get(url, timeout=10)  # Added timeout
-                
-                if response.status_code != 200:
-                    logger.warning(f"Error al descargar imagen. Código de estado: {response.status_code}")
-                    failed_urls.append(url)
-                    continue
-                    
-                img = Image.open(BytesIO(response.content))
-                
-                # Ensure the image is RGB (convert if needed)
-                if img.mode != 'RGB':
-                    logger.info(f"Convirtiendo imagen de modo {img.mode} a RGB")
-                    img = img.convert('RGB')
-                    
-                img = img.resize(img_size)
+        # Descargar todas las imágenes a la vez; las lentas se descartan al vencer el plazo
+        start = time.monotonic()
+        executor = get_image_executor()
+        futures = [executor.submit(self._fetch_image, url, img_size, deadline) for url in urls]
+        wait(futures, timeout=deadline)
+        results = [future.result() if future.done() else None for future in futures]
+        return self._assemble_grid(urls, results, img_size, start, deadline)
+
+    async def aconcatenate_images_square(self, urls, img_size=(300, 300), deadline=None):
+        """Async version of concatenate_images_square."""
+        if not urls:
+            logger.warning("No hay URLs de imágenes para procesar")
+            return None
+        
+        logger.info(f"Procesando {len(urls)} URLs de imágenes")
+        deadline = deadline or float(os.getenv("IMAGE_GRID_DEADLINE", "8"))
+        urls = urls[:int(os.getenv("IMAGE_SELECTION_CANDIDATES", "6"))]
+        
+        # Las descargas que no llegan a tiempo siguen en segundo plano y completan la caché
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(self._afetch_image(url, img_size, deadline)) for url in urls]
+        await asyncio.wait(tasks, timeout=deadline)
+        results = [task.result() if task.done() else None for task in tasks]
+        return await asyncio.to_thread(self._assemble_grid, urls, results, img_size, start, deadline)
+
+    def _assemble_grid(self, urls, results, img_size, start, deadline):
+        """Build the grid from fetch results; a None result is a download that missed the deadline."""
+        images = []
+        self.fetch_timings = []
+        self.tile_hashes = []
+        self.selection_report = []
+        for url, result in zip(urls, results):
+            if result is None:
+                logger.warning(f"Imagen descartada por superar el plazo de {deadline:.1f}s: {url[:60]}")
+                self.fetch_timings.append({"url": url, "ok": False, "timed_out": True})
+                continue
+            img, timing = result
+            self.fetch_timings.append(timing)
+            if img is not None:
                 images.append(img)
-                logger.info("Imagen procesada correctamente")
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error en la solicitud HTTP: {e}")
-                failed_urls.append(url)
-            except Exception as e:
-                logger.error(f"Error al procesar la imagen {url[:60]}: {e}")
-                failed_urls.append(url)
         
-        if failed_urls:
-            logger.warning(f"No se pudieron procesar {len(failed_urls)} imágenes")
+        failed = len(urls) - len(images)
+        if failed:
+            logger.warning(f"No se pudieron procesar {failed} imágenes")
+        logger.info(
+            f"Descarga de imágenes completada en {time.monotonic() - start:.2f}s: "
+            + ", ".join(f"{t.get('download_seconds', '-')}s" for t in self.fetch_timings)
+        )
         
         if not images:
             logger.error("No se pudo procesar ninguna imagen")
             return None
         
-        # Determinar el número de filas y columnas para la cuadrícula
-        n_images = len(images)
-        cols = math.ceil(math.sqrt(n_images))
-        rows = math.ceil(n_images / cols)
+        # Quitar tomas casi duplicadas y quedarse con las más informativas
+        chosen, self.selection_report = ImageSelector().select(images)
+        self.tile_hashes = [self.selection_report[i]["hash"] for i in chosen]
+        images = [images[i] for i in chosen]
         
-        logger.info(f"Creando cuadrícula de {rows}x{cols} para {n_images} imágenes")
-        
-        # Crear una nueva imagen para la cuadrícula
-        grid_width = cols * img_size[0]
-        grid_height = rows * img_size[1]
-        grid_img = Image.new('RGB', (grid_width, grid_height), color='white')
-        
-        # Colocar las imágenes en la cuadrícula
-        for i, img in enumerate(images):
-            x = (i % cols) * img_size[0]
-            y = (i // cols) * img_size[1]
-            grid_img.paste(img, (x, y))
+        grid_img = build_grid(images, img_size)
+        grid_width, grid_height = grid_img.size
         
         logger.info(f"Cuadrícula de imágenes creada correctamente: {grid_width}x{grid_height}")
         return grid_img
 
+    def _vision_request(self, base64_image):
+        """Keyword arguments of the chat completion that describes the grid."""
+        return {
+            "model": self.vision_model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Eres un asistente experto en describir productos a partir de imágenes. Proporciona descripciones detalladas enfocándote en el color, material, estilo, características destacadas y posibles usos del producto. Describe en tercera persona y sin mencionar la imagen en sí."
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Describe este producto en detalle, mencionando sus características principales, materiales, colores y diseño."},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
+                            },
+                        },
+                    ],
+                }
+            ],
+            "temperature": 1,
+            "max_tokens": 1024,
+        }
+
+    def _cached_description(self, concatenated_image):
+        """Return (description cache, hashes, stored description or None)."""
+        # Variantes de color y re-scrapes producen las mismas fotos: reutilizar la descripción
+        cache = get_description_cache()
+        hashes = self.tile_hashes or [dhash(concatenated_image)]
+        cached = cache.lookup(hashes, self.vision_model) if cache else None
+        return cache, hashes, cached
+
     def get_image_description(self, concatenated_image):
         """Generate AI description for a product image or image grid."""
+        self.failed = False
+        cache, hashes, cached = self._cached_description(concatenated_image)
+        if cached is not None:
+            return cached
+        
         try:
             logger.info("Codificando imagen para enviar a la API de visión...")
-            base64_image = self.encode_image(concatenated_image)
+            base64_image, self.encode_report = self._encode(concatenated_image)
             
             logger.info("Solicitando descripción de la imagen al modelo de visión...")
             # Print model being used for debugging
             logger.info(f"Usando modelo de visión: {self.vision_model}")
             
-            completion = self.client.chat.completions.create(
-                model=self.vision_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres un asistente experto en describir productos a partir de imágenes. Proporciona descripciones detalladas enfocándote en el color, material, estilo, características destacadas y posibles usos del producto. Describe en tercera persona y sin mencionar la imagen en sí."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": "Describe este producto en detalle, mencionando sus características principales, materiales, colores y diseño."},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    }
-                ],
-                temperature=1,
-                max_tokens=1024, 
-            )
+            request = self._vision_request(base64_image)
+
+            tokens = estimate_request_tokens(request)
+
+            def create(model):
+                return self.client.chat.completions.create(**{**request, "model": model})
+
+            def backup(abandoned):
+                # El respaldo obtiene su propia cuota y su propio cupo
+                def run():
+                    with get_limiter("vision"):
+                        raise_if_abandoned(abandoned)
+                        return create(self.fallback_vision_model)
+
+                return get_scheduler().call(self.fallback_vision_model, run, tokens)
+
+            def hedged():
+                # Limitar las llamadas simultáneas al modelo de visión en todo el proceso; el hedging
+                # empieza con la cuota y el cupo ya obtenidos y solo cubre la llamada a la API
+                with get_limiter("vision"):
+                    return get_hedger("vision").call(lambda: create(self.vision_model), backup)
+
+            completion = get_scheduler().call(self.vision_model, hedged, tokens)
 
             description = completion.choices[0].message.content
             logger.info("Descripción de imagen generada exitosamente")
+            if cache and description:
+                cache.store(hashes, self.vision_model, description)
             return description
             
         except Exception as e:
             logger.error(f"Error al generar descripción de imagen: {e}")
-            return "No se pudo generar una descripción para la imagen del producto."
\ No newline at end of file
+            self.failed = True
+            return "No se pudo generar una descripción para la imagen del producto."
+
+    async def aget_image_description(self, concatenated_image):
+        """Async version of get_image_description using the async Groq client."""
+        self.failed = False
+        # Calcular hashes y consultar SQLite fuera del event loop
+        cache, hashes, cached = await asyncio.to_thread(self._cached_description, concatenated_image)
+        if cached is not None:
+            return cached
+        
+        try:
+            logger.info("Codificando imagen para enviar a la API de visión...")
+            base64_image, self.encode_report = await asyncio.to_thread(self._encode, concatenated_image)
+            
+            logger.info(f"Solicitando descripción de la imagen al modelo de visión: {self.vision_model}")
+            request = self._vision_request(base64_image)
+
+            tokens = estimate_request_tokens(request)
+
+            def create(model):
+                return self.async_client.chat.completions.create(**{**request, "model": model})
+
+            async def backup():
+                async def run():
+                    async with get_limiter("vision"):
+                        return await create(self.fallback_vision_model)
+
+                return await get_scheduler().acall(self.fallback_vision_model, run, tokens)
+
+            async def hedged():
+                async with get_limiter("vision"):
+                    return await get_hedger("vision").acall(lambda: create(self.vision_model), backup)
+
+            completion = await get_scheduler().acall(self.vision_model, hedged, tokens)
+            
+            description = completion.choices[0].message.content
+            logger.info("Descripción de imagen generada exitosamente")
+            if cache and description:
+                await asyncio.to_thread(cache.store, hashes, self.vision_model, description)
+            return description
+        
+        except Exception as e:
+            logger.error(f"Error al generar descripción de imagen: {e}")
+            self.failed = True
+            return "No se pudo generar una descripción para la imagen del producto."
@@ -0,0 +1,72 @@
+import os
+import logging
+from PIL import ImageFilter, ImageStat
+from dotenv import load_dotenv
+from src.perceptual_hash import dhash, hamming_distance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Tamaño de la miniatura sobre la que se miden bordes y fondo
+PROBE_SIZE = (64, 64)
+EDGE_THRESHOLD = 40
+WHITE_THRESHOLD = 235
+
+
+def informativeness(tile):
+    """Score a tile by edge density and non-white area, both in [0, 1]."""
+    gray = tile.convert("L").resize(PROBE_SIZE)
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    # El filtro marca el borde de la imagen como arista: descartar ese marco de 1 px
+    edges = edges.crop((1, 1, PROBE_SIZE[0] - 1, PROBE_SIZE[1] - 1))
+    edges = edges.point(lambda value: 255 if value > EDGE_THRESHOLD else 0)
+    foreground = gray.point(lambda value: 255 if value < WHITE_THRESHOLD else 0)
+    edge_density = ImageStat.Stat(edges).mean[0] / 255
+    non_white = ImageStat.Stat(foreground).mean[0] / 255
+    return {
+        "edge_density": round(edge_density, 3),
+        "non_white": round(non_white, 3),
+        "score": round(0.6 * edge_density + 0.4 * non_white, 3),
+    }
+
+
+class ImageSelector:
+    """Drop near-duplicate product shots and keep the most informative ones for the grid."""
+
+    def __init__(self, max_images=None, max_distance=None):
+        self.max_images = max_images or int(os.getenv("IMAGE_GRID_MAX_IMAGES", "4"))
+        # Bits distintos (de 64) por debajo de los cuales dos fotos se consideran la misma
+        self.max_distance = max_distance if max_distance is not None else int(
+            os.getenv("IMAGE_DEDUP_MAX_DISTANCE", "10"))
+
+    def select(self, tiles):
+        """Return (indices of the chosen tiles in original order, per-tile report)."""
+        report = []
+        for index, tile in enumerate(tiles):
+            report.append({"index": index, "hash": dhash(tile), **informativeness(tile)})
+
+        # De cada grupo de duplicados sobrevive la versión más informativa
+        kept = []
+        for entry in sorted(report, key=lambda item: (-item["score"], item["index"])):
+            duplicate_of = next(
+                (other for other in kept if hamming_distance(entry["hash"], other["hash"]) <= self.max_distance),
+                None,
+            )
+            if duplicate_of is not None:
+                entry["duplicate_of"] = duplicate_of["index"]
+                continue
+            kept.append(entry)
+
+        chosen = sorted(entry["index"] for entry in kept[:self.max_images])
+        for entry in report:
+            entry["selected"] = entry["index"] in chosen
+        logger.info(
+            f"Selección de imágenes: {len(tiles)} candidatas, "
+            f"{len(tiles) - len(kept)} duplicadas, {len(chosen)} elegidas"
+        )
+        return chosen, report
@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-from groq import Groq
+from groq import Groq, AsyncGroq
 
 
 # Cargar variables del archivo .env
@@ -21,18 +21,38 @@ class GroqModelHandler:
             )
 
         #Initialize the Groq client and ChatGroq LLM
-        self.client = Groq(api_key=api_key)
-        self.llm = ChatGroq(
+        # Sin reintentos propios: los 429 los reintenta el GroqScheduler, que pausa a todos los llamadores
+        self.client = Groq(api_key=api_key, max_retries=0)
+        self.async_client = AsyncGroq(api_key=api_key, max_retries=0)
+        self.llm = self._chat_model(model_name, api_key)
+        # Modelo más rápido al que se envían las llamadas de respaldo (hedging); sin él se repite el mismo
+        fallback_model_name = os.getenv("FALLBACK_MODEL_NAME")
+        self.fallback_llm = self._chat_model(fallback_model_name, api_key) if fallback_model_name else None
+
+    def _chat_model(self, model_name, api_key):
+        """ChatGroq on top of this handler's clients, so every model shares one connection pool."""
+        return ChatGroq(
             model_name=model_name,
             groq_api_key=api_key,
             temperature=0.7,
             max_tokens=1024,
+            max_retries=0,
+            client=self.client.chat.completions,
+            async_client=self.async_client.chat.completions,
         )
 
     def get_client(self):
         # TODO: Return the Groq client instance
         return self.client
 
+    def get_async_client(self):
+        """Return the async Groq client used from coroutines."""
+        return self.async_client
+
     def get_llm(self):
         # Example method for students to follow
-        return self.llm
\ No newline at end of file
+        return self.llm
+
+    def get_fallback_llm(self):
+        """Return the LLM used for hedged calls: FALLBACK_MODEL_NAME, or the main LLM when unset."""
+        return self.fallback_llm or self.llm
\ No newline at end of file
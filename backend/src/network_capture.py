@@ -0,0 +1,75 @@
+import os
+import json
+import logging
+from dotenv import load_dotenv
+from src.resource_policy import read_performance_log
+from src.static_fetcher import find_product_data, product_fields
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Fragmentos de URL de las llamadas XHR/fetch que traen datos de producto. "browse" y "catalog"
+# no: son listados y recomendaciones con productos de otras fichas
+DEFAULT_API_HINTS = "product,pdp,price,variant"
+
+
+class ProductPayloadCapture:
+    """Read product fields from the JSON responses Chrome receives while loading the page.
+
+    Only a product whose ID or variant SKU equals `product_id` is accepted, so a recommendations
+    payload that arrives first cannot supply another product's fields; without an ID nothing is.
+    """
+
+    def __init__(self, driver, product_id, required=(), api_hints=None):
+        self.driver = driver
+        self.product_id = product_id
+        self.required = tuple(required)
+        hints = api_hints or os.getenv("SCRAPER_API_HINTS", DEFAULT_API_HINTS).split(",")
+        self.api_hints = [hint.strip().lower() for hint in hints if hint.strip()]
+        self.messages = []
+        self.fields = {}
+        self.source_url = None
+        self._candidates = {}  # requestId -> URL de respuestas JSON prometedoras
+        # Descartar eventos de red de usos anteriores del driver
+        read_performance_log(driver)
+
+    def _is_candidate(self, response):
+        mime_type = (response.get("mimeType") or "").lower()
+        url = (response.get("url") or "").lower()
+        return "json" in mime_type and any(hint in url for hint in self.api_hints)
+
+    def _read_body(self, request_id):
+        result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        return json.loads(result.get("body") or "null")
+
+    def poll(self):
+        """Consume new network events; return True once every required field is captured."""
+        for message in read_performance_log(self.driver):
+            self.messages.append(message)
+            if self.product_id is None:
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+
+            if method == "Network.responseReceived" and self._is_candidate(params.get("response", {})):
+                self._candidates[params.get("requestId")] = params["response"]["url"]
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._candidates:
+                url = self._candidates.pop(params["requestId"])
+                try:
+                    product = find_product_data(self._read_body(params["requestId"]), self.product_id)
+                except Exception as e:
+                    logger.warning(f"No se pudo leer la respuesta de {url[:80]}: {e}")
+                    continue
+                if not product:
+                    continue
+                for field, value in product_fields(product).items():
+                    self.fields.setdefault(field, value)
+                self.source_url = self.source_url or url
+                logger.info(f"Datos de producto capturados de la red ({url[:80]}): {list(self.fields.keys())}")
+
+        return bool(self.required) and all(field in self.fields for field in self.required)
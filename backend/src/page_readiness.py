@@ -0,0 +1,138 @@
+import os
+import time
+import logging
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Elementos que los extractores necesitan para poder trabajar
+REQUIRED_SELECTORS = {
+    "title": "h1",
+    "price": (
+        "span[data-testid='product-price'], .price-main, .product-price, "
+        "div[class*='price'], span[class*='price']"
+    ),
+    "images": "div.carousel img, div[class*='carousel'] img, img[id^='testId-pod-image']",
+}
+
+# Secciones que Falabella carga de forma diferida al hacer scroll
+LAZY_SELECTORS = {
+    "specifications": "table[class*='spec'], div[class*='specification'], div[class*='spec']",
+    "additional_info": "div[class*='product-information'], div[class*='description'], div[id*='description']",
+}
+
+# Instala un MutationObserver (una sola vez por documento) y devuelve el estado de la página
+_PROBE_SCRIPT = """
+if (!window.__readinessObserver) {
+    window.__lastMutation = Date.now();
+    window.__readinessObserver = new MutationObserver(function () {
+        window.__lastMutation = Date.now();
+    });
+    window.__readinessObserver.observe(document, {childList: true, subtree: true, attributes: true});
+}
+var selectors = arguments[0];
+var present = {};
+for (var key in selectors) {
+    present[key] = !!document.querySelector(selectors[key]);
+}
+return {
+    present: present,
+    readyState: document.readyState,
+    sinceMutation: Date.now() - window.__lastMutation,
+    resources: performance.getEntriesByType('resource').length
+};
+"""
+
+
+class PageReadiness:
+    """Wait for the elements the extractors need instead of sleeping a fixed time."""
+
+    def __init__(self, deadline=None, lazy_wait=None, quiet_ms=None, poll_interval=None,
+                 required=REQUIRED_SELECTORS, lazy=LAZY_SELECTORS):
+        self.deadline = deadline or float(os.getenv("SCRAPER_READY_DEADLINE", "15"))
+        self.lazy_wait = lazy_wait or float(os.getenv("SCRAPER_LAZY_WAIT", "2"))
+        self.quiet_ms = quiet_ms or int(os.getenv("SCRAPER_QUIET_MS", "500"))
+        self.poll_interval = poll_interval or float(os.getenv("SCRAPER_POLL_INTERVAL", "0.1"))
+        self.required = required
+        self.lazy = lazy
+
+    def _probe(self, driver, selectors):
+        return driver.execute_script(_PROBE_SCRIPT, selectors)
+
+    def _wait(self, driver, selectors, until, stop_when=None):
+        """Poll until every selector is present and the page is quiet, or `until` passes."""
+        last_resources = None
+        resources_stable_since = time.monotonic()
+        state = None
+
+        while True:
+            state = self._probe(driver, selectors)
+            now = time.monotonic()
+
+            # Red en reposo: no aparecen nuevos recursos durante la ventana de silencio
+            if state["resources"] != last_resources:
+                last_resources = state["resources"]
+                resources_stable_since = now
+            network_idle = (now - resources_stable_since) * 1000 >= self.quiet_ms
+            dom_quiet = state["sinceMutation"] >= self.quiet_ms
+
+            # Salir en cuanto otra fuente (p. ej. la API del producto) ya trajo los datos
+            if stop_when is not None and stop_when():
+                state["stopped_early"] = True
+                return True, state
+
+            all_present = all(state["present"].values())
+            if all_present and state["readyState"] != "loading" and (network_idle or dom_quiet):
+                return True, state
+            if now >= until:
+                return False, state
+            time.sleep(self.poll_interval)
+
+    def wait_until_ready(self, driver, stop_when=None):
+        """Block until the product page is usable and return a report of the time spent.
+
+        `stop_when` is polled alongside the DOM checks; when it returns True the
+        wait ends immediately and lazy sections are not scrolled into view.
+        """
+        start = time.monotonic()
+        until = start + self.deadline
+
+        ready, state = self._wait(driver, self.required, until, stop_when)
+        stopped_early = state.get("stopped_early", False)
+        missing = [key for key, found in state["present"].items() if not found]
+        if not ready:
+            logger.warning(f"Plazo de espera agotado ({self.deadline:.1f}s); elementos faltantes: {missing}")
+
+        # Solo hacer scroll si las secciones diferidas realmente faltan
+        scrolled = False
+        lazy_missing = []
+        if self.lazy and not stopped_early and time.monotonic() < until:
+            lazy_state = self._probe(driver, self.lazy)
+            lazy_missing = [key for key, found in lazy_state["present"].items() if not found]
+            if lazy_missing:
+                logger.info(f"Secciones diferidas faltantes {lazy_missing}, realizando scroll...")
+                scrolled = True
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                # Muchos productos no tienen estas secciones: no gastar todo el plazo en ellas
+                lazy_until = min(until, time.monotonic() + self.lazy_wait)
+                _, lazy_state = self._wait(driver, self.lazy, lazy_until)
+                driver.execute_script("window.scrollTo(0, 0);")
+                lazy_missing = [key for key, found in lazy_state["present"].items() if not found]
+
+        waited = time.monotonic() - start
+        logger.info(f"Página lista tras esperar {waited:.2f}s (antes: 5s fijos de espera mínima)")
+        return {
+            "ready": ready,
+            "waited_seconds": round(waited, 3),
+            "missing": missing,
+            "lazy_missing": lazy_missing,
+            "scrolled": scrolled,
+            "stopped_early": stopped_early,
+        }
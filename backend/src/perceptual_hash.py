@@ -0,0 +1,43 @@
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def dhash(image, hash_size=8):
+    """Difference hash: 64-bit int that barely changes under resizing, recompression or small crops."""
+    # Una columna extra para comparar cada píxel con su vecino de la derecha
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def match_hash_sets(query, candidate, max_distance):
+    """Pair every hash in `query` with a distinct hash in `candidate` (order-independent).
+
+    Returns the summed distance of the pairing, or None when the sets differ in size
+    or some image has no counterpart within `max_distance` bits.
+    """
+    if len(query) != len(candidate):
+        return None
+    remaining = list(candidate)
+    total = 0
+    for value in query:
+        best = min(remaining, key=lambda other: hamming_distance(value, other), default=None)
+        if best is None:
+            return None
+        distance = hamming_distance(value, best)
+        if distance > max_distance:
+            return None
+        remaining.remove(best)
+        total += distance
+    return total
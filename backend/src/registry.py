@@ -0,0 +1,122 @@
+import logging
+import threading
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from dotenv import load_dotenv
+from src.llm import GroqModelHandler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+
+class ModelRegistry:
+    """Groq clients, chat models, output parsers, compiled prompts and chains shared by every request."""
+
+    def __init__(self, handler=None):
+        self.handler = handler or GroqModelHandler()
+        self._lock = threading.Lock()
+        self._parsers = {}
+        self._prompts = {}
+        self._chains = {}
+
+    @property
+    def llm(self):
+        return self.handler.get_llm()
+
+    @property
+    def fallback_llm(self):
+        return self.handler.get_fallback_llm()
+
+    @property
+    def client(self):
+        return self.handler.get_client()
+
+    @property
+    def async_client(self):
+        return self.handler.get_async_client()
+
+    def parser(self, pydantic_object):
+        """Return the shared output parser for a Pydantic model."""
+        with self._lock:
+            parser = self._parsers.get(pydantic_object)
+            if parser is None:
+                parser = self._parsers[pydantic_object] = PydanticOutputParser(pydantic_object=pydantic_object)
+            return parser
+
+    def prompt(self, template, input_variables, parser=None, format_instructions=None):
+        """Return the compiled PromptTemplate with the parser's (or the given) format instructions."""
+        key = (template, tuple(input_variables), parser.pydantic_object if parser else format_instructions)
+        with self._lock:
+            prompt = self._prompts.get(key)
+        if prompt is not None:
+            return prompt
+        # Las instrucciones de formato salen del esquema JSON del modelo: generarlas es lo costoso
+        if parser is not None:
+            format_instructions = parser.get_format_instructions()
+        prompt = PromptTemplate(
+            template=template,
+            input_variables=list(input_variables),
+            partial_variables={"format_instructions": format_instructions},
+        )
+        with self._lock:
+            return self._prompts.setdefault(key, prompt)
+
+    def chain(self, key, build):
+        """Return the shared chain for `key`, building it with build() on first use."""
+        with self._lock:
+            chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+        chain = build()
+        with self._lock:
+            return self._chains.setdefault(key, chain)
+
+    def precompile(self):
+        """Compile every content-generation chain once, so requests only look them up."""
+        # Import diferido: content_generator importa este módulo
+        from src.content_generator import ContentGenerator
+        ContentGenerator(self).precompile()
+
+    def warmup(self):
+        """Open the sync connection pool with a request that spends no tokens."""
+        self.client.models.list()
+
+    async def awarmup(self):
+        """Open the async connection pool with a request that spends no tokens."""
+        await self.async_client.models.list()
+
+    async def aclose(self):
+        self.client.close()
+        await self.async_client.close()
+
+    def stats(self):
+        with self._lock:
+            return {"parsers": len(self._parsers), "prompts": len(self._prompts), "chains": len(self._chains)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide model registry, building it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+            logger.info(f"Registro de modelos creado (modelo {_registry.llm.model_name})")
+        return _registry
+
+
+async def close_registry():
+    """Close the shared Groq clients; called at application shutdown."""
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        await registry.aclose()
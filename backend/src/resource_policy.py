@@ -0,0 +1,201 @@
+import os
+import json
+import logging
+import threading
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+MEDIA_PATTERNS = ["*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg", "*.mov"]
+TRACKER_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*connect.facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*criteo.com*",
+    "*criteo.net*",
+    "*analytics.tiktok.com*",
+    "*bat.bing.com*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+]
+
+# Tamaño típico por tipo de recurso, para estimar los bytes que no se descargaron
+TYPICAL_BYTES = {
+    "Image": 60 * 1024,
+    "Font": 40 * 1024,
+    "Media": 500 * 1024,
+    "Script": 30 * 1024,
+    "Other": 5 * 1024,
+}
+
+# Cuenta las imágenes del DOM que el navegador no descargó por la política
+_BLOCKED_IMAGES_SCRIPT = """
+var count = 0;
+document.querySelectorAll('img[src]').forEach(function (img) {
+    if (img.naturalWidth === 0) { count++; }
+});
+return count;
+"""
+
+
+def _env_flag(name, default="true"):
+    return os.getenv(name, default).lower() == "true"
+
+
+def read_performance_log(driver):
+    """Drain Chrome's performance log and return the DevTools messages it contained."""
+    messages = []
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logger.warning(f"No se pudo leer el log de rendimiento de Chrome: {e}")
+        return messages
+    for entry in entries:
+        try:
+            messages.append(json.loads(entry["message"])["message"])
+        except (KeyError, ValueError):
+            continue
+    return messages
+
+
+class ResourcePolicy:
+    """Which resources headless Chrome may download while we only read the DOM."""
+
+    def __init__(self, block_images=True, block_fonts=True, block_media=True,
+                 block_trackers=True, allowlist=None):
+        self.block_images = block_images
+        self.block_fonts = block_fonts
+        self.block_media = block_media
+        self.block_trackers = block_trackers
+        # Fragmentos de URL de los que depende el renderizado y nunca se bloquean
+        self.allowlist = [item.strip() for item in (allowlist or []) if item.strip()]
+
+        # Acumulados de todas las páginas cargadas por el proceso
+        self._lock = threading.Lock()
+        self._totals = {"pages": 0, "requests_blocked": 0, "bytes_loaded": 0, "estimated_bytes_saved": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build the policy from SCRAPER_BLOCK_* environment variables."""
+        return cls(
+            block_images=_env_flag("SCRAPER_BLOCK_IMAGES"),
+            block_fonts=_env_flag("SCRAPER_BLOCK_FONTS"),
+            block_media=_env_flag("SCRAPER_BLOCK_MEDIA"),
+            block_trackers=_env_flag("SCRAPER_BLOCK_TRACKERS"),
+            allowlist=os.getenv("SCRAPER_BLOCK_ALLOWLIST", "").split(","),
+        )
+
+    def _allowed(self, pattern):
+        return any(item in pattern for item in self.allowlist)
+
+    def blocked_url_patterns(self):
+        """URL patterns passed to DevTools Network.setBlockedURLs."""
+        patterns = []
+        if self.block_fonts:
+            patterns += FONT_PATTERNS
+        if self.block_media:
+            patterns += MEDIA_PATTERNS
+        if self.block_trackers:
+            patterns += TRACKER_PATTERNS
+        return [pattern for pattern in patterns if not self._allowed(pattern)]
+
+    def apply_to_options(self, chrome_options):
+        """Set Chrome prefs and enable the performance log used for the savings report."""
+        if self.block_images:
+            # Las imágenes se descargan aparte en ImageGridDescriber; solo leemos su src
+            chrome_options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    def apply_to_driver(self, driver):
+        """Enable the DevTools Network domain and install the network blocklist on a freshly created driver."""
+        try:
+            # Siempre: ProductPayloadCapture lee cuerpos de respuesta con Network.getResponseBody
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception as e:
+            logger.warning(f"No se pudo activar el dominio Network de DevTools: {e}")
+            return
+        patterns = self.blocked_url_patterns()
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            logger.info(f"Bloqueando {len(patterns)} patrones de recursos en Chrome")
+        except Exception as e:
+            logger.warning(f"No se pudo aplicar el bloqueo de recursos vía DevTools: {e}")
+
+    def page_report(self, driver, messages):
+        """Summarise requests blocked and bytes loaded/saved for one page load."""
+        request_types = {}
+        blocked = {}
+        bytes_loaded = 0
+        requests_loaded = 0
+
+        for message in messages:
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                request_types[params.get("requestId")] = params.get("type", "Other")
+            elif method == "Network.loadingFinished":
+                requests_loaded += 1
+                bytes_loaded += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                resource_type = params.get("type") or request_types.get(params.get("requestId"), "Other")
+                blocked[resource_type] = blocked.get(resource_type, 0) + 1
+
+        if self.block_images:
+            try:
+                blocked_images = driver.execute_script(_BLOCKED_IMAGES_SCRIPT)
+                if blocked_images:
+                    blocked["Image"] = blocked.get("Image", 0) + blocked_images
+            except Exception as e:
+                logger.warning(f"No se pudieron contar las imágenes bloqueadas: {e}")
+
+        estimated_saved = sum(
+            count * TYPICAL_BYTES.get(resource_type, TYPICAL_BYTES["Other"])
+            for resource_type, count in blocked.items()
+        )
+        report = {
+            "requests_loaded": requests_loaded,
+            "bytes_loaded": bytes_loaded,
+            "requests_blocked": sum(blocked.values()),
+            "blocked_by_type": blocked,
+            "estimated_bytes_saved": estimated_saved,
+        }
+        with self._lock:
+            self._totals["pages"] += 1
+            self._totals["requests_blocked"] += report["requests_blocked"]
+            self._totals["bytes_loaded"] += bytes_loaded
+            self._totals["estimated_bytes_saved"] += estimated_saved
+        logger.info(
+            f"Recursos: {requests_loaded} cargados ({bytes_loaded / 1024:.0f} KB), "
+            f"{report['requests_blocked']} bloqueados (~{estimated_saved / 1024:.0f} KB ahorrados)"
+        )
+        return report
+
+    def stats(self):
+        """Return the policy and the savings accumulated across page loads."""
+        with self._lock:
+            totals = dict(self._totals)
+        return {
+            "block_images": self.block_images,
+            "blocked_patterns": len(self.blocked_url_patterns()),
+            "allowlist": self.allowlist,
+            **totals,
+        }
+
+
+RESOURCE_POLICY = ResourcePolicy.from_env()
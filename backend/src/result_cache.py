@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+# Capa -> (variable de entorno, segundos de validez por defecto). Los datos scrapeados caducan
+# antes porque precio y stock cambian; los guiones dependen solo de sus entradas
+LAYER_TTLS = {
+    "scrape": ("RESULT_CACHE_SCRAPE_TTL", "1800"),
+    "base": ("RESULT_CACHE_BASE_TTL", "86400"),
+    "refined": ("RESULT_CACHE_REFINED_TTL", "86400"),
+}
+
+_PRODUCT_ID_RE = re.compile(r"/product/([^/]+)")
+
+
+def product_id(url):
+    """Product ID from a /product/<id>/ URL, or None."""
+    match = _PRODUCT_ID_RE.search(urlsplit(url.strip()).path)
+    return match.group(1) if match else None
+
+
+def product_key(url):
+    """Normalize a product URL to "host:product id" so slugs, SKUs and query strings share one entry."""
+    parsed = urlsplit(url.strip())
+    host = parsed.netloc.lower().removeprefix("www.")
+    match = _PRODUCT_ID_RE.search(parsed.path)
+    if match:
+        return f"{host}:{match.group(1)}"
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def fingerprint(*parts):
+    """Stable SHA-256 of JSON-serializable parts, used as a cache key."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Pipeline results per layer: a per-process LRU in front of a SQLite file shared by all workers."""
+
+    def __init__(self, path=None, memory_entries=None, ttls=None):
+        self.path = path or os.getenv("RESULT_CACHE_PATH", ".cache/results.sqlite3")
+        self.memory_entries = memory_entries or int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "512"))
+        self.ttls = ttls or {layer: int(os.getenv(var, default)) for layer, (var, default) in LAYER_TTLS.items()}
+
+        self._lock = threading.Lock()
+        # (capa, clave) -> (expira, JSON), del menos al más reciente; se guarda serializado para
+        # que quien modifique el resultado no altere la copia cacheada
+        self._memory = OrderedDict()
+        self._counters = {layer: {"memory": 0, "store": 0, "miss": 0} for layer in self.ttls}
+        self._evictions = 0
+        self._db = self._connect()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            # WAL permite que los workers de gunicorn lean mientras otro escribe
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "layer TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (layer, key))"
+            )
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"No se pudo abrir la caché de resultados en disco, solo se usará memoria: {e}")
+            return None
+
+    def _remember(self, entry_key, expires_at, payload):
+        self._memory[entry_key] = (expires_at, payload)
+        self._memory.move_to_end(entry_key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, layer, key):
+        """Return (value, "memory" | "store") on a hit or (None, "miss")."""
+        now = time.time()
+        entry_key = (layer, key)
+        with self._lock:
+            entry = self._memory.get(entry_key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(entry_key)
+                self._counters[layer]["memory"] += 1
+                return json.loads(entry[1]), "memory"
+            self._memory.pop(entry_key, None)
+
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM results WHERE layer = ? AND key = ? AND expires_at > ?",
+                        (layer, key, now),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error leyendo la caché de resultados: {e}")
+            if row is None:
+                self._counters[layer]["miss"] += 1
+                return None, "miss"
+            self._remember(entry_key, row[1], row[0])
+            self._counters[layer]["store"] += 1
+        return json.loads(row[0]), "store"
+
+    def put(self, layer, key, value):
+        """Store a result in both tiers with the layer's TTL and drop expired rows."""
+        now = time.time()
+        expires_at = now + self.ttls[layer]
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember((layer, key), expires_at, payload)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (layer, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (layer, key, payload, expires_at),
+                )
+                self._db.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo guardar en la caché de resultados: {e}")
+
+    def stats(self):
+        """Return per-layer hits by tier and misses; a memory hit skips even the SQLite read."""
+        with self._lock:
+            stored = None
+            if self._db is not None:
+                try:
+                    stored = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            layers = {}
+            for layer, counters in self._counters.items():
+                lookups = sum(counters.values())
+                hits = counters["memory"] + counters["store"]
+                layers[layer] = {
+                    **counters,
+                    "ttl": self.ttls[layer],
+                    "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                }
+            return {
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.memory_entries,
+                "memory_evictions": self._evictions,
+                "stored_entries": stored,
+                "layers": layers,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache, or None when disabled via RESULT_CACHE_ENABLED."""
+    global _cache
+    if os.getenv("RESULT_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
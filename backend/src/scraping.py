@@ -1,562 +1,300 @@
+import os
 import time
+import asyncio
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import requests
-from io import BytesIO
-from PIL import Image
-import math
-from src.image_describer import ImageGridDescriber
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException
+from src.image_describer import ImageGridDescriber, get_describe_executor
+from src.driver_pool import get_driver_pool
+from src.page_readiness import PageReadiness
+from src.resource_policy import RESOURCE_POLICY
+from src.network_capture import ProductPayloadCapture
+from src.static_fetcher import StaticProductFetcher
+from src.extraction_plan import PRODUCT_PLAN, EXCLUDED_IMAGE_WORDS, MAX_IMAGES, parse_product_html, size_hint
+from src.result_cache import get_result_cache, product_key, product_id
+from src.concurrency import get_flight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Campos del producto que se extraen de la página
+PRODUCT_FIELDS = (
+    "title",
+    "price",
+    "available_sizes",
+    "image_links",
+    "specifications",
+    "additional_info",
+)
+
+# Campos que _product_data() sustituye por valores de ejemplo si faltan; "Talla única" es la
+# respuesta real de los productos sin selector de tallas, así que available_sizes no cuenta
+PLACEHOLDER_FIELDS = ("title", "price", "specifications", "additional_info")
+
+# Campos que se intentan leer del DOM vivo cuando el HTML no los tenía
+BROWSER_FIELDS = ("available_sizes", "image_links", "specifications", "additional_info")
+
+# Extractor inyectado: devuelve todos los campos pedidos en un solo execute_script
+BROWSER_EXTRACT_SCRIPT = """
+var wanted = arguments[0], excluded = arguments[1], maxImages = arguments[2];
+var result = {};
+
+function text(el) { return (el.innerText || el.textContent || '').trim(); }
+
+if (wanted.indexOf('available_sizes') !== -1) {
+    var sizeSelectors = [
+        "div.size-options button",
+        "button[class*='size-button']",
+        "button[id^='testId-sizeButton-']",
+        "div[class*='size'] button",
+        "div[class*='variante'] button",
+        "div.jsx-2889528833 button"
+    ];
+    for (var i = 0; i < sizeSelectors.length; i++) {
+        var sizes = [];
+        document.querySelectorAll(sizeSelectors[i]).forEach(function (button) {
+            var size = text(button);
+            if (size && sizes.indexOf(size) === -1) { sizes.push(size); }
+        });
+        if (sizes.length) { result.available_sizes = sizes; break; }
+    }
+}
+
+if (wanted.indexOf('image_links') !== -1) {
+    var images = document.querySelectorAll('.carousel img');
+    if (!images.length) {
+        images = document.querySelectorAll("img[id^='testId-pod-image'], img[class*='product'], img[src*='product']");
+    }
+    var links = [];
+    var addLink = function (url) {
+        if (url && links.indexOf(url) === -1 && links.length < maxImages) { links.push(url); }
+    };
+    images.forEach(function (img) {
+        var src = img.getAttribute('src');
+        if (!src) { return; }
+        var lower = src.toLowerCase();
+        for (var j = 0; j < excluded.length; j++) {
+            if (lower.indexOf(excluded[j]) !== -1) { return; }
+        }
+        addLink(src.replace('w=100,h=100', 'w=500,h=500'));
+    });
+    // Completar con las versiones 2x de srcset cuando hay pocas imágenes
+    if (links.length < 4) {
+        document.querySelectorAll('img[srcset]').forEach(function (img) {
+            img.getAttribute('srcset').split(',').forEach(function (part) {
+                part = part.trim();
+                if (part.indexOf('2x') !== -1 && part.indexOf('/w=200,h=200') !== -1) {
+                    addLink(part.split(' ')[0].replace('w=200,h=200', 'w=500,h=500'));
+                }
+            });
+        });
+    }
+    result.image_links = links;
+}
+
+if (wanted.indexOf('specifications') !== -1) {
+    var specs = {};
+    document.querySelectorAll("div[class*='spec'], div[class*='detail'], table[class*='spec']").forEach(function (el) {
+        text(el).split('\\n').forEach(function (line) {
+            var idx = line.indexOf(':');
+            if (idx === -1) { return; }
+            var key = line.slice(0, idx).trim(), value = line.slice(idx + 1).trim();
+            if (key && value) { specs[key] = value; }
+        });
+    });
+    result.specifications = specs;
+}
+
+if (wanted.indexOf('additional_info') !== -1) {
+    var blocks = document.querySelectorAll("div[class*='description'], div[class*='information'], div[class*='detail']");
+    for (var k = 0; k < blocks.length; k++) {
+        var info = text(blocks[k]);
+        if (info.length > 20) { result.additional_info = info; break; }
+    }
+}
+
+return result;
+"""
+
+# Sin estos campos el guion no sirve, así que justifican lanzar el navegador
+REQUIRED_FIELDS = ("title", "price", "image_links")
+
+_scrape_executor = None
+_scrape_lock = threading.Lock()
+
+
+def get_scrape_executor():
+    """Return the dedicated, size-limited thread pool for blocking scraping work (HTTP fetch + Selenium)."""
+    global _scrape_executor
+    with _scrape_lock:
+        if _scrape_executor is None:
+            workers = int(os.getenv("SCRAPER_WORKERS", "8"))
+            _scrape_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+        return _scrape_executor
+
+
 class FalabellaScraper:
-    def __init__(self, url):
+    def __init__(self, url, pool=None):
         self.url = url
-        self.driver = self._setup_driver()
+        # El navegador solo se toma del pool si la descarga estática no basta
+        self.pool = pool or get_driver_pool()
+        self.driver = None
+        self.driver_healthy = True
         self.soup = None
-        self._load_page()
+        self.page_title = None
+        self.readiness = None
+        self.resource_report = None
+        self.field_sources = {}
+        self.stage_timings = {}
+        # Descripción de imágenes en segundo plano, lanzada en cuanto se conocen los enlaces
+        self._image_future = None
+        # Event loop de ascrape(), si el scraping se lanzó desde una corrutina
+        self._loop = None
+        # Capa "scrape" de la caché de resultados: "memory", "store" o "miss" (None si está desactivada)
+        self.cache = get_result_cache()
+        self.cache_key = product_key(url)
+        self.cache_status = None
+        # True si el scraping se compartió con otra solicitud en curso del mismo producto
+        self.coalesced = False
+        # Motivos para no guardar el resultado en la caché: descripción fallida o campos de ejemplo
+        self.image_description_failed = False
+        self.placeholder_fields = []
 
-    def _setup_driver(self):
-        """Configure and return a Chrome WebDriver instance."""
-        logger.info("Configurando driver de Chrome...")
-        
-        # Configurar opciones de Chrome
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Ejecutar en modo headless
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        # User agent para evitar bloqueos
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-        
-        # Inicializar el driver
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            logger.info("Driver de Chrome configurado correctamente")
-            return driver
-        except Exception as e:
-            logger.error(f"Error al configurar driver de Chrome: {e}")
-            # Intentar con una configuración alternativa
-            try:
-                logger.info("Intentando configuración alternativa...")
-                chrome_options.add_argument("--disable-extensions")
-                chrome_options.add_argument("--disable-notifications")
-                return webdriver.Chrome(options=chrome_options)
-            except Exception as e2:
-                logger.error(f"Error en configuración alternativa: {e2}")
-                raise
-
-    def _load_page(self):
+    def _load_static(self):
+        """Fetch the page over plain HTTP and return the fields found in it."""
+        if os.getenv("SCRAPER_STATIC_FAST_PATH", "true").lower() != "true":
+            return None
+        logger.info(f"Descargando página sin navegador: {self.url}")
+        page = StaticProductFetcher().fetch(self.url)
+        if page is None:
+            return None
+        self.soup = page.soup
+        self.page_title = page.page_title
+        return page.fields
+
+    def _load_browser(self, required=REQUIRED_FIELDS):
+        """Borrow a Chrome session from the pool, render the page and return fields from its API calls."""
+        # Tomar prestado un Chrome ya iniciado del pool en lugar de lanzar uno nuevo
+        self.driver = self.pool.acquire()
+        return self._load_page(required)
+
+    def _load_page(self, required=REQUIRED_FIELDS):
         """Load the URL page and prepare for scraping."""
         logger.info(f"Cargando página: {self.url}")
+        capture = None
         try:
+            capture = ProductPayloadCapture(self.driver, product_id(self.url), required=required)
             self.driver.get(self.url)
             
-            # Esperar a que la página cargue completamente
+            # Esperar a los elementos que necesitamos, o solo hasta que llegue el JSON del producto
             logger.info("Esperando que la página cargue...")
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Esperar un poco más para asegurar que el JS se ejecute
-            time.sleep(3)
-            
-            # Scroll para asegurar que se carguen elementos dinámicos
-            logger.info("Realizando scroll para cargar elementos dinámicos...")
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-            time.sleep(1)
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
-            self.driver.execute_script("window.scrollTo(0, 0);")
+            self.readiness = PageReadiness().wait_until_ready(self.driver, stop_when=capture.poll)
+            capture.poll()
+            self.resource_report = RESOURCE_POLICY.page_report(self.driver, capture.messages)
             
             # Obtener el HTML después de que el JavaScript se haya ejecutado
             logger.info("Obteniendo HTML de la página...")
             html = self.driver.page_source
-            self.soup = BeautifulSoup(html, "html.parser")
+            self.soup, self.page_title = parse_product_html(html)
             logger.info("Página cargada correctamente")
+        except WebDriverException as e:
+            logger.error(f"Error del navegador al cargar la página: {e}")
+            # Marcar el driver para que el pool lo recicle si el navegador falló
+            self.driver_healthy = self.pool.is_healthy(self.driver)
+            self.soup = None
         except Exception as e:
             logger.error(f"Error al cargar la página: {e}")
             self.soup = None
+        return capture.fields if capture else {}
 
     def close(self):
-        """Close the browser when finished."""
+        """Return the browser to the pool when finished."""
         if self.driver:
-            logger.info("Cerrando el navegador...")
-            self.driver.quit()
-            logger.info("Navegador cerrado")
+            logger.info("Devolviendo el navegador al pool...")
+            self.pool.release(self.driver, healthy=self.driver_healthy)
+            self.driver = None
+            logger.info("Navegador devuelto al pool")
 
-    def get_product_name(self):
-        """Extract the product name."""
-        logger.info("Extrayendo nombre del producto...")
-        try:
-            if not self.soup:
-                return "Nombre no encontrado"
-                
-            # Array de posibles selectores para el nombre del producto
-            selectors = [
-                "h1.product-name", 
-                "h1[data-name]",
-                "div.product-name h1",
-                ".product-detail h1",
-                "h1.jsx-1794488219",
-                "h1[class*='title']",
-                "h1[class*='name']"
-            ]
-            
-            # Intentar con BeautifulSoup usando los selectores
-            for selector in selectors:
-                element = self.soup.select_one(selector)
-                if element:
-                    name = element.text.strip()
-                    logger.info(f"Nombre encontrado con selector {selector}: {name}")
-                    return name
-            
-            # Si no se encuentra con selectores, intentar con Selenium
-            try:
-                product_name_element = self.driver.find_element(By.TAG_NAME, "h1")
-                if product_name_element:
-                    name = product_name_element.text.strip()
-                    logger.info(f"Nombre encontrado con Selenium: {name}")
-                    return name
-            except Exception as e:
-                logger.error(f"Error al buscar nombre con Selenium: {e}")
-            
-            # Si no encontramos el nombre, buscamos en la etiqueta title
-            if self.soup.title:
-                title_text = self.soup.title.text.strip()
-                # Normalmente el título contiene el nombre del producto seguido por el nombre de la tienda
-                if " - " in title_text:
-                    name = title_text.split(" - ")[0].strip()
-                    logger.info(f"Nombre extraído del título de la página: {name}")
-                    return name
-                    
-            logger.warning("No se pudo encontrar el nombre del producto")
-            return "Nombre no encontrado"
-            
-        except Exception as e:
-            logger.error(f"Error al obtener el nombre del producto: {e}")
-            return "Nombre no encontrado"
+    def _browser_extract(self, fields):
+        """Read every requested field from the live DOM in a single WebDriver round-trip."""
+        return self.driver.execute_script(
+            BROWSER_EXTRACT_SCRIPT, list(fields), list(EXCLUDED_IMAGE_WORDS), MAX_IMAGES
+        ) or {}
 
-    def get_product_price(self):
-        """Extract the product price."""
-        logger.info("Extrayendo precio del producto...")
-        try:
-            if not self.soup:
-                return "Precio no encontrado"
-                
-            # Array de posibles selectores para el precio
-            price_selectors = [
-                "span.copy17.primary.senary.jsx-2835692965.bold",
-                "span.copy12.primary.senary.jsx-2835692965.bold",
-                "span[data-testid='product-price']",
-                ".price-main",
-                ".product-price",
-                "div[class*='price']",
-                "span[class*='price']"
-            ]
-            
-            # Intentar con BeautifulSoup
-            for selector in price_selectors:
-                price_tag = self.soup.select_one(selector)
-                if price_tag:
-                    price = price_tag.text.strip()
-                    logger.info(f"Precio encontrado con selector {selector}: {price}")
-                    return price
-            
-            # Intentar con Selenium
-            try:
-                # Buscar elementos que puedan contener el precio
-                price_elements = self.driver.find_elements(
-                    By.CSS_SELECTOR, 
-                    "span[class*='price'], div[class*='price'], span.primary.senary.bold, span[data-testid*='price']"
-                )
-                
-                for element in price_elements:
-                    price_text = element.text.strip()
-                    # Verificar si el texto se parece a un precio (contiene números y simbolos de moneda)
-                    if price_text and (
-                        "$" in price_text or 
-                        "€" in price_text or 
-                        "S/" in price_text or 
-                        "£" in price_text or 
-                        any(char.isdigit() for char in price_text)
-                    ):
-                        logger.info(f"Precio encontrado con Selenium: {price_text}")
-                        return price_text
-            except Exception as e:
-                logger.error(f"Error al buscar precio con Selenium: {e}")
-                
-            logger.warning("No se pudo encontrar el precio del producto")
-            return "Precio no encontrado"
-            
-        except Exception as e:
-            logger.error(f"Error al obtener el precio del producto: {e}")
-            return "Precio no encontrado"
-
-    def get_available_sizes(self):
-        """Extract available product sizes."""
-        logger.info("Extrayendo tallas disponibles...")
-        sizes = []
+    def _extract_missing(self, fields, tier):
+        """Resolve every field not yet in `fields` and record the tier that served it."""
+        missing = [field for field in PRODUCT_FIELDS if field not in fields]
+        if not missing or not self.soup:
+            return
         
-        try:
-            if not self.soup:
-                return ["Talla única"]
-                
-            # Intentar encontrar tallas con Selenium primero (más confiable para elementos dinámicos)
-            try:
-                # Buscar diferentes patrones de botones de talla
-                size_selectors = [
-                    "div.size-options button", 
-                    "button[class*='size-button']",
-                    "button[id^='testId-sizeButton-']",
-                    "div[class*='size'] button",
-                    "div[class*='variante'] button",
-                    "div.jsx-2889528833 button"  # Selector específico observado en Falabella
-                ]
-                
-                for selector in size_selectors:
-                    size_buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if size_buttons:
-                        for button in size_buttons:
-                            size_text = button.text.strip()
-                            if size_text and size_text not in sizes:
-                                sizes.append(size_text)
-                        
-                        if sizes:
-                            logger.info(f"Tallas encontradas con selector {selector}: {sizes}")
-                            break
-                
-            except Exception as e:
-                logger.error(f"Error al buscar tallas con Selenium: {e}")
-            
-            # Si no encontramos tallas con Selenium, intentar con BeautifulSoup
-            if not sizes:
-                # Selectores similares pero para BeautifulSoup
-                for selector in ["div.size-options button", "button[class*='size']", "div[class*='variante'] button"]:
-                    size_elements = self.soup.select(selector)
-                    for element in size_elements:
-                        size_text = element.text.strip()
-                        if size_text and size_text not in sizes:
-                            sizes.append(size_text)
-                    
-                    if sizes:
-                        logger.info(f"Tallas encontradas con BeautifulSoup: {sizes}")
-                        break
-            
-            # Si aún no tenemos tallas, buscar en cualquier elemento que contenga la palabra "talla" o "size"
-            if not sizes:
-                size_related = self.soup.find_all(string=lambda text: 
-                    text and ("talla" in text.lower() or "size" in text.lower())
-                )
-                
-                if size_related:
-                    for text in size_related:
-                        parent = text.parent
-                        if parent and parent.name != "script" and parent.name != "style":
-                            # Obtener el texto del elemento padre, que probablemente contiene la información de talla
-                            size_info = parent.text.strip()
-                            if size_info:
-                                logger.info(f"Información de talla encontrada: {size_info}")
-                                # Agregar como un solo elemento ya que es información textual, no tallas individuales
-                                sizes.append(size_info)
-                                break
-        
-        except Exception as e:
-            logger.error(f"Error al obtener tallas: {e}")
-        
-        # Si no se encontraron tallas, devolver "Talla única"
-        if not sizes:
-            logger.warning("No se encontraron tallas, asumiendo talla única")
-            return ["Talla única"]
-            
-        return sizes
-
-    def get_image_links(self):
-        """Extract product image links."""
-        logger.info("Extrayendo enlaces de imágenes...")
-        image_links = []
+        # Un único recorrido del contenedor del producto resuelve todos los campos
+        values = PRODUCT_PLAN.run(self.soup, page_title=self.page_title, fields=missing)
+        for field in missing:
+            if values.get(field):
+                fields[field] = values[field]
+                self.field_sources[field] = tier
         
+        # Con el navegador disponible, leer del DOM vivo lo que el HTML no tenía
+        browser_missing = [field for field in BROWSER_FIELDS if field not in fields]
+        if self.driver is None or not browser_missing:
+            return
+        time_checkpoint = time.time()
         try:
-            if not self.soup:
-                return []
-                
-            # 1. Buscar el carrusel en la estructura específica que vimos en los ejemplos
-            carousel = self.soup.find("div", class_="jsx-733916836 carousel")
-            
-            if carousel:
-                logger.info("Carrusel encontrado con estructura específica")
-                # Buscar imágenes dentro del carrusel
-                image_tags = carousel.find_all("img")
-                
-                for img in image_tags:
-                    if img.has_attr("src"):
-                        img_url = img["src"]
-                        # Convertir de baja a alta resolución
-                        high_res_url = img_url.replace("w=100,h=100", "w=500,h=500")
-                        
-                        if high_res_url not in image_links:
-                            image_links.append(high_res_url)
-                
-                if image_links:
-                    logger.info(f"Se encontraron {len(image_links)} imágenes en el carrusel")
-            
-            # 2. Si no encontramos el carrusel específico o no tiene imágenes, buscar con otros selectores
-            if not image_links:
-                logger.info("Buscando imágenes con selectores alternativos...")
-                # Selectores alternativos
-                alt_selectors = [
-                    "img[id^='testId-pod-image']",
-                    "div[class*='carousel'] img",
-                    "div[class*='gallery'] img",
-                    "img[class*='product']",
-                    "img[src*='product']"
-                ]
-                
-                for selector in alt_selectors:
-                    images = self.soup.select(selector)
-                    for img in images:
-                        if img.has_attr("src") and not any(excluded in img["src"].lower() 
-                                                         for excluded in ["icon", "logo", "banner"]):
-                            img_url = img["src"]
-                            high_res_url = img_url.replace("w=100,h=100", "w=500,h=500")
-                            
-                            if high_res_url not in image_links:
-                                image_links.append(high_res_url)
-                    
-                    if image_links:
-                        logger.info(f"Se encontraron {len(image_links)} imágenes con selector {selector}")
-                        break
-            
-            # 3. Si todavía no hay imágenes, intentar con Selenium
-            if not image_links:
-                logger.info("Intentando extraer imágenes con Selenium...")
-                try:
-                    # Primero buscar el carrusel con Selenium
-                    carousel_elements = self.driver.find_elements(By.CLASS_NAME, "carousel")
-                    
-                    if carousel_elements:
-                        selenium_images = []
-                        for carousel in carousel_elements:
-                            carousel_images = carousel.find_elements(By.TAG_NAME, "img")
-                            selenium_images.extend(carousel_images)
-                    else:
-                        # Si no hay carrusel, buscar imágenes de producto directamente
-                        selenium_images = self.driver.find_elements(
-                            By.CSS_SELECTOR, 
-                            "img[id^='testId-pod-image'], img[class*='product'], img[src*='product']"
-                        )
-                    
-                    for img in selenium_images:
-                        src = img.get_attribute("src")
-                        if src and not any(excluded in src.lower() 
-                                         for excluded in ["icon", "logo", "banner"]):
-                            high_res_url = src.replace("w=100,h=100", "w=500,h=500")
-                            if high_res_url not in image_links:
-                                image_links.append(high_res_url)
-                    
-                    if image_links:
-                        logger.info(f"Se encontraron {len(image_links)} imágenes con Selenium")
-                        
-                except Exception as e:
-                    logger.error(f"Error al obtener imágenes con Selenium: {e}")
-            
-            # 4. Inspeccionar los srcset para encontrar imágenes de mayor resolución
-            if image_links and all("w=100,h=100" in url for url in image_links):
-                logger.info("Buscando imágenes de mayor resolución en srcset...")
-                
-                # Con BeautifulSoup
-                img_tags_with_srcset = self.soup.find_all("img", srcset=True)
-                for img in img_tags_with_srcset:
-                    srcset = img["srcset"]
-                    # Típicamente el srcset contiene URLs separadas por coma
-                    urls = srcset.split(",")
-                    for url_part in urls:
-                        if "2x" in url_part and "/w=200,h=200" in url_part:  # Imágenes de mayor resolución
-                            url = url_part.split(" ")[0].strip()
-                            high_res_url = url.replace("w=200,h=200", "w=500,h=500")
-                            if high_res_url not in image_links:
-                                image_links.append(high_res_url)
-                
-                # Con Selenium
-                try:
-                    img_elements = self.driver.find_elements(By.TAG_NAME, "img")
-                    for img in img_elements:
-                        srcset = img.get_attribute("srcset")
-                        if srcset:
-                            urls = srcset.split(",")
-                            for url_part in urls:
-                                if "2x" in url_part and "/w=200,h=200" in url_part:
-                                    url = url_part.split(" ")[0].strip()
-                                    high_res_url = url.replace("w=200,h=200", "w=500,h=500")
-                                    if high_res_url not in image_links:
-                                        image_links.append(high_res_url)
-                except Exception as e:
-                    logger.error(f"Error al buscar en srcset con Selenium: {e}")
-            
+            values = self._browser_extract(browser_missing)
         except Exception as e:
-            logger.error(f"Error al obtener enlaces de imágenes: {e}")
-        
-        # Limitar a un máximo de imágenes y registrar resultado
-        image_links = image_links[:6]  # Podemos aumentar este límite si es necesario
-        
-        if image_links:
-            logger.info(f"Total de {len(image_links)} imágenes encontradas")
-            for i, url in enumerate(image_links):
-                logger.info(f"Imagen {i+1}: {url[:60]}...")
+            logger.error(f"Error al obtener {browser_missing} con Selenium: {e}")
+            return
+        logger.info(f"Tiempo para obtener {browser_missing} con Selenium (1 llamada): {time.time() - time_checkpoint:.2f}s")
+        for field in browser_missing:
+            if values.get(field):
+                fields[field] = values[field]
+                self.field_sources[field] = tier
+
+    @property
+    def image_future(self):
+        """Future with the image description while it runs in the background, or None."""
+        return self._image_future
+
+    def _start_image_description(self, fields):
+        """Start downloading and describing the images as soon as their links are known."""
+        if self._image_future is not None or not fields.get("image_links"):
+            return
+        logger.info("Enlaces de imágenes disponibles, iniciando descripción en paralelo")
+        if self._loop is not None:
+            # Desde ascrape(): la descripción corre como corrutina en el event loop
+            self._image_future = asyncio.run_coroutine_threadsafe(
+                self._atimed_image_description(fields["image_links"]), self._loop
+            )
         else:
-            logger.warning("No se encontraron imágenes")
-        
-        return image_links
+            # copy_context: la llamada de visión hereda el carril de prioridad de la solicitud
+            self._image_future = get_describe_executor().submit(
+                contextvars.copy_context().run, self._timed_image_description, fields["image_links"]
+            )
 
-    def get_product_specifications(self):
-        """Extract product specifications."""
-        logger.info("Extrayendo especificaciones del producto...")
-        specifications = {}
-        
+    def _timed_image_description(self, image_links):
+        start = time.time()
         try:
-            if not self.soup:
-                return specifications
-                
-            # Buscar tablas de especificaciones
-            spec_selectors = [
-                "table[class*='specification']",
-                "table[class*='spec']",
-                "div[class*='specification']",
-                "div[class*='spec']",
-                "div[class*='details']"
-            ]
-            
-            for selector in spec_selectors:
-                elements = self.soup.select(selector)
-                for element in elements:
-                    # Si es una tabla, procesar filas y celdas
-                    if element.name == "table":
-                        rows = element.find_all("tr")
-                        for row in rows:
-                            cells = row.find_all("td")
-                            if len(cells) >= 2:
-                                key = cells[0].text.strip()
-                                value = cells[1].text.strip()
-                                specifications[key] = value
-                    else:
-                        # Si es un div, buscar pares clave-valor
-                        keys = element.find_all(["dt", "h3", "strong", "span[class*='label']"])
-                        for key_elem in keys:
-                            key = key_elem.text.strip()
-                            # Buscar el valor siguiente
-                            value_elem = key_elem.find_next(["dd", "p", "span", "div"])
-                            if value_elem:
-                                value = value_elem.text.strip()
-                                specifications[key] = value
-                
-                if specifications:
-                    logger.info(f"Especificaciones encontradas con selector {selector}")
-                    break
-            
-            # Si no encontramos especificaciones, intentar con Selenium
-            if not specifications:
-                try:
-                    # Intentar encontrar secciones de especificaciones
-                    spec_elements = self.driver.find_elements(
-                        By.CSS_SELECTOR, 
-                        "div[class*='spec'], div[class*='detail'], table[class*='spec']"
-                    )
-                    
-                    for element in spec_elements:
-                        # Obtener el texto completo y procesarlo
-                        spec_text = element.text
-                        if spec_text:
-                            # Dividir por líneas y buscar pares clave:valor
-                            lines = spec_text.split('\n')
-                            for line in lines:
-                                if ':' in line:
-                                    parts = line.split(':', 1)
-                                    key = parts[0].strip()
-                                    value = parts[1].strip()
-                                    if key and value:
-                                        specifications[key] = value
-                except Exception as e:
-                    logger.error(f"Error al buscar especificaciones con Selenium: {e}")
-        
-        except Exception as e:
-            logger.error(f"Error al obtener especificaciones: {e}")
-        
-        if specifications:
-            logger.info(f"Se encontraron {len(specifications)} especificaciones")
-        else:
-            logger.warning("No se encontraron especificaciones")
-            
-        return specifications
+            return self.get_image_description(image_links)
+        finally:
+            self.stage_timings["image_description"] = round(time.time() - start, 2)
 
-    def get_additional_info(self):
-        """Extract additional product information."""
-        logger.info("Extrayendo información adicional...")
+    async def _atimed_image_description(self, image_links):
+        start = time.time()
         try:
-            if not self.soup:
-                return "Información adicional no encontrada"
-                
-            # Buscar secciones con información adicional
-            info_selectors = [
-                "div[class*='product-information']",
-                "div[class*='product-detail']",
-                "div[class*='description']",
-                "div[id*='description']",
-                "p[class*='description']"
-            ]
-            
-            for selector in info_selectors:
-                info_elements = self.soup.select(selector)
-                for element in info_elements:
-                    info_text = element.text.strip()
-                    if info_text and len(info_text) > 20:  # Filtrar textos muy cortos
-                        logger.info(f"Información adicional encontrada con selector {selector}")
-                        return info_text
-            
-            # Si no encontramos con BeautifulSoup, intentar con Selenium
-            try:
-                info_elements = self.driver.find_elements(
-                    By.CSS_SELECTOR, 
-                    "div[class*='description'], div[class*='information'], div[class*='detail']"
-                )
-                
-                for element in info_elements:
-                    info_text = element.text.strip()
-                    if info_text and len(info_text) > 20:
-                        logger.info(f"Información adicional encontrada con Selenium")
-                        return info_text
-            except Exception as e:
-                logger.error(f"Error al buscar información adicional con Selenium: {e}")
-            
-            # Si no encontramos información específica, usar las especificaciones
-            specs = self.get_product_specifications()
-            if specs:
-                specs_text = ", ".join([f"{k}: {v}" for k, v in specs.items()])
-                logger.info("Usando especificaciones como información adicional")
-                return specs_text
-                
-            logger.warning("No se encontró información adicional")
-            return "Información adicional no encontrada"
-            
-        except Exception as e:
-            logger.error(f"Error al obtener información adicional: {e}")
-            return "Información adicional no encontrada"
+            return await self.aget_image_description(image_links)
+        finally:
+            self.stage_timings["image_description"] = round(time.time() - start, 2)
 
     def get_image_description(self, image_links):
         """Get AI-generated description of product images."""
         logger.info("Generando descripción de imágenes...")
         if not image_links:
             logger.warning("No hay imágenes para describir")
+            self.image_description_failed = True
             return "No hay imágenes disponibles para describir el producto."
         
         try:
@@ -565,106 +303,318 @@ class FalabellaScraper:
             # Initialize the image describer
             image_describer = ImageGridDescriber()
             
-            # Create a composite image from the first 4 images (or fewer if less available)
-            image_links_to_process = image_links[:4]
-            logger.info(f"Creando cuadrícula con {len(image_links_to_process)} imágenes")
+            # Create a composite image from the most informative, non-duplicate images
+            logger.info(f"Creando cuadrícula a partir de {len(image_links)} imágenes candidatas")
             
             # Attempt to create the concatenated image
-            concatenated_image = image_describer.concatenate_images_square(image_links_to_process)
+            concatenated_image = image_describer.concatenate_images_square(image_links)
             
             # If successful, get the AI description
             if concatenated_image:
                 logger.info("Cuadrícula creada con éxito, generando descripción...")
                 description = image_describer.get_image_description(concatenated_image)
+                self.image_description_failed = image_describer.failed
                 logger.info("Descripción generada con éxito")
                 return description
             else:
                 logger.warning("No se pudo crear la cuadrícula de imágenes")
+                self.image_description_failed = True
                 return "No se pudieron procesar las imágenes para generar una descripción detallada del producto."
         except Exception as e:
             logger.error(f"Error en el proceso de descripción de imágenes: {e}")
+            self.image_description_failed = True
             return f"Error al generar la descripción de las imágenes: {str(e)}"
 
-    def scrape(self):
-        """Main method to scrape all product data."""
-        logger.info(f"Iniciando scraping completo para URL: {self.url}")
+    async def aget_image_description(self, image_links):
+        """Async version of get_image_description (async downloads and vision client)."""
+        if not image_links:
+            logger.warning("No hay imágenes para describir")
+            self.image_description_failed = True
+            return "No hay imágenes disponibles para describir el producto."
         
-        if not self.soup:
-            logger.warning("No se pudo cargar la página, devolviendo datos de ejemplo")
-            # Si no se pudo obtener la página, devolver datos de ejemplo
-            return {
-                "title": "Producto de ejemplo",
-                "price": "S/ 999",
-                "description": "Descripción de ejemplo",
-                "additional_info": "Información adicional de ejemplo",
-                "available_sizes": "Talla única",
-                "image_description": "Descripción de imagen de ejemplo",
-                "image_links": []
-            }
+        try:
+            logger.info(f"Procesando {len(image_links)} imágenes para generar descripción...")
+            image_describer = ImageGridDescriber()
+            concatenated_image = await image_describer.aconcatenate_images_square(image_links)
+            if concatenated_image:
+                description = await image_describer.aget_image_description(concatenated_image)
+                self.image_description_failed = image_describer.failed
+                logger.info("Descripción generada con éxito")
+                return description
+            logger.warning("No se pudo crear la cuadrícula de imágenes")
+            self.image_description_failed = True
+            return "No se pudieron procesar las imágenes para generar una descripción detallada del producto."
+        except Exception as e:
+            logger.error(f"Error en el proceso de descripción de imágenes: {e}")
+            self.image_description_failed = True
+            return f"Error al generar la descripción de las imágenes: {str(e)}"
+
+    def _collect_fields(self, start_time):
+        """Run the static and browser tiers and return the product fields found (may be empty)."""
+        try:
+            fields = {}
+        
+            # 1. Nivel rápido: HTML estático y JSON embebido de Next.js
+            static_fields = self._load_static()
+            if static_fields is not None:
+                for field, value in static_fields.items():
+                    fields[field] = value
+                    self.field_sources[field] = "static_json"
+                self._start_image_description(fields)
+                self._extract_missing(fields, "static_html")
+                self._start_image_description(fields)
+                logger.info(f"Nivel estático completado en {time.time() - start_time:.2f}s")
+            self.stage_timings["static"] = round(time.time() - start_time, 2)
+        
+            # 2. Nivel lento: renderizar con Chrome solo si faltan campos requeridos
+            missing_required = [field for field in REQUIRED_FIELDS if field not in fields]
+            if missing_required:
+                logger.info(f"Faltan campos requeridos {missing_required}, usando el navegador")
+                time_checkpoint = time.time()
+                api_fields = self._load_browser(missing_required)
+                # Preferir el JSON de la API del producto; el DOM queda como respaldo
+                for field, value in api_fields.items():
+                    if field not in fields:
+                        fields[field] = value
+                        self.field_sources[field] = "browser_api"
+                self._start_image_description(fields)
+                if self.soup:
+                    self._extract_missing(fields, "browser")
+                    self._start_image_description(fields)
+                self.stage_timings["browser"] = round(time.time() - time_checkpoint, 2)
+        
+            # Último recurso para las tallas, después de los botones del DOM vivo: un texto que
+            # mencione la talla. No cuenta para decidir si se usa el navegador
+            if fields and "available_sizes" not in fields and self.soup:
+                hint = size_hint(self.soup)
+                if hint:
+                    fields["available_sizes"] = [hint]
+                    self.field_sources["available_sizes"] = "size_hint"
+        
+            # Si no encontramos información adicional, usar las especificaciones
+            if fields and "additional_info" not in fields and fields.get("specifications"):
+                fields["additional_info"] = ", ".join(f"{k}: {v}" for k, v in fields["specifications"].items())
+                self.field_sources["additional_info"] = self.field_sources["specifications"]
         
+            self.stage_timings["extraction"] = round(time.time() - start_time, 2)
+            return fields
+        finally:
+            # Devolver el navegador antes de esperar a la descripción de imágenes
+            self.close()
+
+    def _product_data(self, fields, image_description):
+        """Compile all the data in the dictionary returned by scrape()."""
+        specifications = fields.get("specifications")
+        available_sizes = fields.get("available_sizes")
+        self.placeholder_fields = [field for field in PLACEHOLDER_FIELDS if not fields.get(field)]
+        return {
+            "title": fields.get("title", "Producto de ejemplo"),
+            "price": fields.get("price", "S/ 999"),
+            "description": str(specifications) if specifications else "Descripción de ejemplo",
+            "additional_info": fields.get("additional_info", "Información adicional de ejemplo"),
+            "available_sizes": ", ".join(available_sizes) if available_sizes else "Talla única",
+            "image_description": image_description,
+            "image_links": fields.get("image_links", []),
+            "field_sources": self.field_sources,
+            "stage_timings": self.stage_timings
+        }
+
+    @staticmethod
+    def _example_data():
+        logger.warning("No se pudo cargar la página, devolviendo datos de ejemplo")
+        # Si no se pudo obtener la página, devolver datos de ejemplo
+        return {
+            "title": "Producto de ejemplo",
+            "price": "S/ 999",
+            "description": "Descripción de ejemplo",
+            "additional_info": "Información adicional de ejemplo",
+            "available_sizes": "Talla única",
+            "image_description": "Descripción de imagen de ejemplo",
+            "image_links": [],
+            "field_sources": {}
+        }
+
+    def _error_data(self, error):
+        logger.error(f"Error durante el scraping: {error}")
+        # Devolver datos básicos en caso de error
+        return {
+            "title": "Error al obtener producto",
+            "price": "Precio no disponible",
+            "description": f"No se pudo obtener la descripción. Error: {str(error)}",
+            "additional_info": "Información no disponible",
+            "available_sizes": "Talla única",
+            "image_description": "No se pudo generar descripción de imágenes",
+            "image_links": [],
+            "field_sources": self.field_sources,
+            "stage_timings": self.stage_timings
+        }
+
+    def _finish(self, fields, image_description, start_time):
+        self.stage_timings["total"] = round(time.time() - start_time, 2)
+        logger.info(f"Tiempos por etapa: {self.stage_timings}")
+        logger.info(f"Origen de cada campo: {self.field_sources}")
+        logger.info(f"Scraping completado en {time.time() - start_time:.2f} segundos")
+        data = self._product_data(fields, image_description)
+        self._store_metadata(data)
+        return data
+
+    def _shared_metadata(self, metadata, image_future, start_time):
+        """Adopt the metadata of a concurrent scrape of the same product that this call joined."""
+        logger.info(f"Scraping de {self.cache_key} compartido con una solicitud en curso")
+        self._image_future = image_future
+        self.field_sources = metadata.get("field_sources", {})
+        self.stage_timings = {"shared_wait": round(time.time() - start_time, 2)}
+        return {**metadata, "stage_timings": self.stage_timings}
+
+    def _cached_metadata(self):
+        """Return the metadata scraped earlier for the same product ID, or None."""
+        if self.cache is None:
+            return None
+        start_time = time.time()
+        metadata, self.cache_status = self.cache.get("scrape", self.cache_key)
+        if metadata is None:
+            return None
+        logger.info(f"Metadata de {self.cache_key} servida desde la caché ({self.cache_status})")
+        self.field_sources = metadata.get("field_sources", {})
+        self.stage_timings = {"cache": round(time.time() - start_time, 3)}
+        metadata["stage_timings"] = self.stage_timings
+        return metadata
+
+    def _cacheable(self):
+        """Only complete scrapes are cached: base and refined scripts are keyed on this metadata."""
+        if self.placeholder_fields:
+            logger.info(f"Metadata sin guardar en caché, campos de ejemplo: {self.placeholder_fields}")
+            return False
+        if self.image_description_failed:
+            logger.info("Metadata sin guardar en caché: la descripción de imágenes falló")
+            return False
+        return True
+
+    def _store_metadata(self, data):
+        """Cache a successful scrape; with deferred images, once the description has arrived."""
+        if self.cache is None:
+            return
+        if data["image_description"] is not None or self._image_future is None:
+            if self._cacheable():
+                self.cache.put("scrape", self.cache_key, data)
+            return
+
+        def store_when_described(future):
+            if future.cancelled() or future.exception() is not None or not self._cacheable():
+                return
+            described = {**data, "image_description": future.result()}
+            if self._loop is not None:
+                # En ascrape() el futuro se resuelve en el hilo del event loop: SQLite se escribe en otro hilo
+                self._loop.run_in_executor(None, self.cache.put, "scrape", self.cache_key, described)
+            else:
+                self.cache.put("scrape", self.cache_key, described)
+
+        self._image_future.add_done_callback(store_when_described)
+
+    def scrape(self, defer_images=False):
+        """Main method to scrape all product data.
+
+        With `defer_images`, return as soon as the text fields are ready: `image_description`
+        is None and the description keeps running in `self.image_future`. A product scraped
+        recently is served from the result cache, complete and with `image_future` None.
+        """
+        logger.info(f"Iniciando scraping completo para URL: {self.url}")
+        cached = self._cached_metadata()
+        if cached is not None:
+            return cached
+        start_time = time.time()
+        (metadata, image_future), self.coalesced = get_flight("scrape").do(
+            self.cache_key, self._scrape_once, defer_images
+        )
+        if not self.coalesced:
+            return metadata
+        metadata = self._shared_metadata(metadata, image_future, start_time)
+        if not defer_images and metadata["image_description"] is None and image_future is not None:
+            metadata["image_description"] = image_future.result()
+        return metadata
+
+    def _scrape_once(self, defer_images):
+        """Run scrape() as the leader of its product; return (metadata, image future) for followers."""
+        return self._scrape(defer_images), self._image_future
+
+    def _scrape(self, defer_images):
         try:
-            # Obtener todos los datos del producto
             start_time = time.time()
+            fields = self._collect_fields(start_time)
+            if not fields:
+                return self._example_data()
             
-            # 1. Obtener nombre del producto
-            product_name = self.get_product_name()
-            logger.info(f"Tiempo para obtener nombre: {time.time() - start_time:.2f}s")
-            
-            # 2. Obtener precio
-            time_checkpoint = time.time()
-            product_price = self.get_product_price()
-            logger.info(f"Tiempo para obtener precio: {time.time() - time_checkpoint:.2f}s")
-            
-            # 3. Obtener tallas disponibles
-            time_checkpoint = time.time()
-            available_sizes = self.get_available_sizes()
-            logger.info(f"Tiempo para obtener tallas: {time.time() - time_checkpoint:.2f}s")
-            
-            # 4. Obtener enlaces de imágenes
-            time_checkpoint = time.time()
-            image_links = self.get_image_links()
-            logger.info(f"Tiempo para obtener enlaces de imágenes: {time.time() - time_checkpoint:.2f}s")
-            
-            # 5. Obtener especificaciones
-            time_checkpoint = time.time()
-            specifications = self.get_product_specifications()
-            logger.info(f"Tiempo para obtener especificaciones: {time.time() - time_checkpoint:.2f}s")
-            
-            # 6. Obtener información adicional
+            # 3. Esperar la descripción de imágenes, que corría en paralelo con la extracción
             time_checkpoint = time.time()
-            additional_info = self.get_additional_info()
-            logger.info(f"Tiempo para obtener info adicional: {time.time() - time_checkpoint:.2f}s")
+            if defer_images:
+                # El llamador recoge la descripción de self.image_future cuando la necesite
+                image_description = None
+                if self._image_future is None:
+                    self._image_future = get_describe_executor().submit(
+                        contextvars.copy_context().run, self._timed_image_description, fields.get("image_links", [])
+                    )
+                logger.info("Campos de texto listos; la descripción de imágenes sigue en segundo plano")
+            elif self._image_future is not None:
+                image_description = self._image_future.result()
+            else:
+                image_description = self.get_image_description(fields.get("image_links", []))
+            self.stage_timings["image_wait"] = round(time.time() - time_checkpoint, 2)
+            return self._finish(fields, image_description, start_time)
+        except Exception as e:
+            return self._error_data(e)
+        finally:
+            # Devolvemos el driver al pool después de scrapear
+            self.close()
+
+    async def ascrape(self, defer_images=False):
+        """Async version of scrape(): Selenium and page fetching run on the dedicated scrape executor,
+        image downloads and the vision call run on the event loop."""
+        logger.info(f"Iniciando scraping completo para URL: {self.url}")
+        cached = await asyncio.to_thread(self._cached_metadata)
+        if cached is not None:
+            return cached
+        start_time = time.time()
+        (metadata, image_future), self.coalesced = await get_flight("scrape").ado(
+            self.cache_key, self._ascrape_once, defer_images
+        )
+        if not self.coalesced:
+            return metadata
+        metadata = self._shared_metadata(metadata, image_future, start_time)
+        if not defer_images and metadata["image_description"] is None and image_future is not None:
+            metadata["image_description"] = await asyncio.shield(asyncio.wrap_future(image_future))
+        return metadata
+
+    async def _ascrape_once(self, defer_images):
+        return await self._ascrape(defer_images), self._image_future
+
+    async def _ascrape(self, defer_images):
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        
+        try:
+            start_time = time.time()
+            # copy_context: la descripción que se lanza desde el hilo conserva el carril y el presupuesto de hedging
+            fields = await loop.run_in_executor(
+                get_scrape_executor(), contextvars.copy_context().run, self._collect_fields, start_time
+            )
+            if not fields:
+                return self._example_data()
             
-            # 7. Obtener descripción de imágenes (proceso más lento, hacerlo al final)
             time_checkpoint = time.time()
-            image_description = self.get_image_description(image_links)
-            logger.info(f"Tiempo para generar descripción de imágenes: {time.time() - time_checkpoint:.2f}s")
-            
-            # Compilar todos los datos en un diccionario
-            product_data = {
-                "title": product_name if product_name and product_name != "Nombre no encontrado" else "Producto de ejemplo",
-                "price": product_price if product_price and product_price != "Precio no encontrado" else "S/ 999",
-                "description": str(specifications) if specifications else "Descripción de ejemplo",
-                "additional_info": additional_info if additional_info and additional_info != "Información adicional no encontrada" else "Información adicional de ejemplo",
-                "available_sizes": ", ".join(available_sizes) if available_sizes else "Talla única",
-                "image_description": image_description,
-                "image_links": image_links
-            }
-            
-            logger.info(f"Scraping completado en {time.time() - start_time:.2f} segundos")
-            return product_data
+            if self._image_future is None:
+                # Futuro de hilos, no Task: un scrape síncrono que comparta este resultado puede esperarlo
+                self._image_future = asyncio.run_coroutine_threadsafe(
+                    self._atimed_image_description(fields.get("image_links", [])), loop
+                )
+            if defer_images:
+                image_description = None
+                logger.info("Campos de texto listos; la descripción de imágenes sigue en segundo plano")
+            else:
+                image_description = await asyncio.wrap_future(self._image_future)
+            self.stage_timings["image_wait"] = round(time.time() - time_checkpoint, 2)
+            # _finish() guarda en la caché (SQLite): fuera del event loop
+            return await asyncio.to_thread(self._finish, fields, image_description, start_time)
         except Exception as e:
-            logger.error(f"Error durante el scraping: {e}")
-            # Devolver datos básicos en caso de error
-            return {
-                "title": "Error al obtener producto",
-                "price": "Precio no disponible",
-                "description": f"No se pudo obtener la descripción. Error: {str(e)}",
-                "additional_info": "Información no disponible",
-                "available_sizes": "Talla única",
-                "image_description": "No se pudo generar descripción de imágenes",
-                "image_links": []
-            }
+            return self._error_data(e)
         finally:
-            # Cerramos el driver después de scrapear
-            self.close()
\ No newline at end of file
+            self.close()
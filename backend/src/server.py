@@ -1,11 +1,28 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
+import os
+import json
+import asyncio
 import logging
 import traceback
 import time
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.content_generator import ContentGenerator
-from models.content_generation_models import ContentGeneration
+from models.content_generation_models import ContentGeneration, ContentVariantsGeneration, ContentBatchGeneration
 from src.scraping import FalabellaScraper
+from src.driver_pool import get_driver_pool, shutdown_driver_pool
+from src.resource_policy import RESOURCE_POLICY
+from src.image_cache import get_image_cache
+from src.description_cache import get_description_cache
+from src.result_cache import get_result_cache, product_key
+from src.concurrency import limiter_stats, get_flight, flight_stats
+from src.image_describer import close_async_image_client
+from src.groq_scheduler import get_scheduler, lane
+from src.hedging import hedge_budget, hedging_stats
+from src.registry import get_registry, close_registry
 
 # Configurar logs con formato mejorado
 logging.basicConfig(
@@ -14,12 +31,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_batch_executor = None
+_batch_lock = threading.Lock()
+
+
+def get_batch_executor():
+    """Return the worker pool shared by all batch requests (BATCH_WORKERS URLs in flight)."""
+    global _batch_executor
+    with _batch_lock:
+        if _batch_executor is None:
+            workers = int(os.getenv("BATCH_WORKERS", "4"))
+            _batch_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        return _batch_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up shared resources at startup and release them at shutdown."""
+    pool = get_driver_pool()
+    if os.getenv("CHROME_POOL_PREWARM", "true").lower() == "true":
+        try:
+            pool.prewarm()
+        except Exception as e:
+            logger.error(f"No se pudo precalentar el pool de Chrome: {e}")
+    try:
+        # Clientes de Groq, parsers, prompts y cadenas se construyen una vez y los comparten todas las solicitudes
+        registry = get_registry()
+        registry.precompile()
+        if os.getenv("LLM_WARMUP", "true").lower() == "true":
+            start_time = time.time()
+            await asyncio.to_thread(registry.warmup)
+            await registry.awarmup()
+            logger.info(f"Conexiones con Groq precalentadas en {time.time() - start_time:.2f} segundos")
+    except Exception as e:
+        logger.error(f"No se pudo precalentar el registro de modelos: {e}")
+    yield
+    shutdown_driver_pool()
+    await close_async_image_client()
+    await close_registry()
+
+
 app = FastAPI(
     title="AI-Powered Text Generation with LLMs",
     description="""Create high-quality text content using advanced Large Language Models (LLMs).  
                   Generate textual descriptions, narratives, and insights from images and text inputs.  
                   Access the Streamlit interface at port 8501 for an interactive experience.""",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
@@ -29,45 +87,177 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Expose runtime metrics used to size shared resources per container"""
+    image_cache = get_image_cache()
+    description_cache = get_description_cache()
+    result_cache = get_result_cache()
+    return {
+        "driver_pool": get_driver_pool().stats(),
+        "resource_blocking": RESOURCE_POLICY.stats(),
+        "image_cache": image_cache.stats() if image_cache else None,
+        "description_cache": description_cache.stats() if description_cache else None,
+        "result_cache": result_cache.stats() if result_cache else None,
+        "concurrency": limiter_stats(),
+        "single_flight": flight_stats(),
+        "groq_scheduler": get_scheduler().stats(),
+        "hedging": hedging_stats(),
+    }
+
+
+def _resolve_pipeline(pipeline, vision_deadline):
+    """Apply the environment defaults to the requested pipeline mode and vision deadline."""
+    pipeline = pipeline or os.getenv("CONTENT_PIPELINE_MODE", "sequential")
+    if pipeline not in ("sequential", "speculative", "fused"):
+        raise ValueError(f"Modo de generación no soportado: {pipeline}")
+    if vision_deadline is None and os.getenv("SPECULATIVE_VISION_DEADLINE"):
+        vision_deadline = float(os.getenv("SPECULATIVE_VISION_DEADLINE"))
+    return pipeline, vision_deadline
+
+
+def _pipeline_key(url, new_target_audience, new_tone, language, pipeline, vision_deadline):
+    """Key under which identical concurrent requests share one pipeline execution."""
+    pipeline, vision_deadline = _resolve_pipeline(pipeline, vision_deadline)
+    return product_key(url), new_target_audience, new_tone, language, pipeline, vision_deadline
+
+
+def _cache_report(scraper, content_generator):
+    """Which result-cache layers hit for one request: "memory", "store" or "miss" per layer."""
+    report = {"scrape": scraper.cache_status} if scraper.cache_status else {}
+    report.update(content_generator.cache_report)
+    return report
+
+
+def run_content_pipeline(url, new_target_audience, new_tone, language, pipeline=None, vision_deadline=None):
+    """Scrape one product URL and generate its script; return the API response body."""
+    start_time = time.time()
+    pipeline, vision_deadline = _resolve_pipeline(pipeline, vision_deadline)
+    speculative = pipeline == "speculative"
+    
+    # Scrape metadata using FalabellaScraper
+    logger.info(f"Iniciando web scraping de la URL: {url} (modo {pipeline})")
+    scraper = FalabellaScraper(url)
+    # En modo especulativo la descripción de imágenes sigue corriendo mientras se redacta el texto
+    metadata = scraper.scrape(defer_images=speculative)
+    scrape_time = time.time()
+    logger.info(f"Web scraping completado en {scrape_time - start_time:.2f} segundos")
+
+    # Validate metadata
+    if not metadata or not isinstance(metadata, dict):
+        logger.error("La metadata obtenida no es válida")
+        raise ValueError("No se pudo extraer metadata válida del producto.")
+
+    # Log metadata keys for debugging (without the full content to keep logs clean)
+    logger.info(f"Metadata obtenida con claves: {list(metadata.keys())}")
+    
+    # Generate content using the ContentGenerator
+    logger.info("Iniciando generación de contenido con LLM")
+    content_generator = ContentGenerator()
+    if speculative:
+        content = content_generator.generate_content_speculative(
+            metadata,
+            scraper.image_future,
+            new_target_audience,
+            new_tone,
+            language,
+            vision_deadline=vision_deadline,
+        )
+    elif pipeline == "fused":
+        content = content_generator.generate_content_fused(
+            metadata,
+            new_target_audience,
+            new_tone,
+            language
+        )
+    else:
+        content = content_generator.generate_content(
+            metadata, 
+            new_target_audience, 
+            new_tone, 
+            language
+        )
+    generation_time = time.time()
+    logger.info(f"Generación de contenido completada en {generation_time - scrape_time:.2f} segundos")
+    return {
+        "generated_content": content,
+        "field_sources": metadata.get("field_sources", {}),
+        "stage_timings": metadata.get("stage_timings", {}),
+        "pipeline": content_generator.pipeline_report,
+        "cache": _cache_report(scraper, content_generator),
+    }
+
+
+async def arun_content_pipeline(url, new_target_audience, new_tone, language, pipeline=None, vision_deadline=None):
+    """Async version of run_content_pipeline: only the Selenium/HTTP scrape occupies a thread."""
+    start_time = time.time()
+    pipeline, vision_deadline = _resolve_pipeline(pipeline, vision_deadline)
+    speculative = pipeline == "speculative"
+    
+    logger.info(f"Iniciando web scraping de la URL: {url} (modo {pipeline})")
+    scraper = FalabellaScraper(url)
+    metadata = await scraper.ascrape(defer_images=speculative)
+    scrape_time = time.time()
+    logger.info(f"Web scraping completado en {scrape_time - start_time:.2f} segundos")
+
+    if not metadata or not isinstance(metadata, dict):
+        logger.error("La metadata obtenida no es válida")
+        raise ValueError("No se pudo extraer metadata válida del producto.")
+    
+    logger.info("Iniciando generación de contenido con LLM")
+    content_generator = ContentGenerator()
+    if speculative:
+        content = await content_generator.agenerate_content_speculative(
+            metadata,
+            scraper.image_future,
+            new_target_audience,
+            new_tone,
+            language,
+            vision_deadline=vision_deadline,
+        )
+    elif pipeline == "fused":
+        content = await content_generator.agenerate_content_fused(
+            metadata, new_target_audience, new_tone, language
+        )
+    else:
+        content = await content_generator.agenerate_content(
+            metadata, new_target_audience, new_tone, language
+        )
+    logger.info(f"Generación de contenido completada en {time.time() - scrape_time:.2f} segundos")
+    return {
+        "generated_content": content,
+        "field_sources": metadata.get("field_sources", {}),
+        "stage_timings": metadata.get("stage_timings", {}),
+        "pipeline": content_generator.pipeline_report,
+        "cache": _cache_report(scraper, content_generator),
+    }
+
+
 @app.post("/content_generator")
-def generate_content(request: ContentGeneration):
+async def generate_content(request: ContentGeneration):
     """Generate content based on metadata scraped from the given URL"""
     start_time = time.time()
     logger.info(f"Iniciando generación de contenido para URL: {request.url}")
     logger.info(f"Parámetros: Audiencia={request.new_target_audience}, Tono={request.new_tone}, Idioma={request.language}")
     
     try:
-        # Scrape metadata using FalabellaScraper
-        logger.info(f"Iniciando web scraping de la URL: {request.url}")
-        scraper = FalabellaScraper(request.url)
-        metadata = scraper.scrape()
-        scrape_time = time.time()
-        logger.info(f"Web scraping completado en {scrape_time - start_time:.2f} segundos")
-
-        # Validate metadata
-        if not metadata or not isinstance(metadata, dict):
-            logger.error("La metadata obtenida no es válida")
-            raise ValueError("No se pudo extraer metadata válida del producto.")
-
-        # Log metadata keys for debugging (without the full content to keep logs clean)
-        logger.info(f"Metadata obtenida con claves: {list(metadata.keys())}")
-        
-        # Generate content using the ContentGenerator
-        logger.info("Iniciando generación de contenido con LLM")
-        content_generator = ContentGenerator()
-        content = content_generator.generate_content(
-            metadata, 
-            request.new_target_audience, 
-            request.new_tone, 
-            request.language
+        args = (
+            request.url,
+            request.new_target_audience,
+            request.new_tone,
+            request.language,
+            request.pipeline,
+            request.vision_deadline,
         )
-        generation_time = time.time()
-        logger.info(f"Generación de contenido completada en {generation_time - scrape_time:.2f} segundos")
+        # Las solicitudes idénticas en curso comparten una sola ejecución del pipeline
+        with hedge_budget():
+            response, shared = await get_flight("pipeline").ado(_pipeline_key(*args), arun_content_pipeline, *args)
+        response = {**response, "coalesced": shared}
 
         # Log successful generation
         total_time = time.time() - start_time
         logger.info(f"Proceso completo finalizado con éxito en {total_time:.2f} segundos")
-        return {"generated_content": content}
+        return response
 
     except ValueError as ve:
         logger.error(f"Error de validación: {ve}")
@@ -81,4 +271,178 @@ def generate_content(request: ContentGeneration):
         logger.error(traceback.format_exc())
         raise HTTPException(
             status_code=500, detail={"error": "Error interno", "message": str(e)}
-        )
\ No newline at end of file
+        )
+
+
+@app.post("/content_generator/variants")
+def generate_content_variants(request: ContentVariantsGeneration):
+    """Scrape, describe and draft a product once, then refine it for every requested variant"""
+    start_time = time.time()
+    logger.info(f"Iniciando generación de {len(request.variants)} variantes para URL: {request.url}")
+    
+    try:
+        with hedge_budget():
+            # Las etapas compartidas (scraping, visión y guion base) se ejecutan una sola vez
+            scraper = FalabellaScraper(request.url)
+            metadata = scraper.scrape()
+            scrape_time = time.time()
+            logger.info(f"Web scraping completado en {scrape_time - start_time:.2f} segundos")
+
+            if not metadata or not isinstance(metadata, dict):
+                logger.error("La metadata obtenida no es válida")
+                raise ValueError("No se pudo extraer metadata válida del producto.")
+
+            content_generator = ContentGenerator()
+            base_content = content_generator.generate_text(metadata)
+            base_time = time.time()
+            logger.info(f"Guion base generado en {base_time - scrape_time:.2f} segundos")
+
+            variants = [variant.dict() for variant in request.variants]
+            refined, errors = content_generator.refine_variants(
+                base_content.get("content", str(base_content)), variants
+            )
+            refine_time = time.time()
+        logger.info(f"{len(variants)} variantes refinadas en {refine_time - base_time:.2f} segundos")
+
+        return {
+            # Como en /batch: una variante fallida lleva status "error" y el mensaje, sin contenido
+            "variants": [
+                {**variant, "status": "ok", "generated_content": content} if error is None
+                else {**variant, "status": "error", "generated_content": None, "error": error}
+                for variant, content, error in zip(variants, refined, errors)
+            ],
+            "field_sources": metadata.get("field_sources", {}),
+            "stage_timings": {
+                **metadata.get("stage_timings", {}),
+                "scrape": round(scrape_time - start_time, 2),
+                "base_generation": round(base_time - scrape_time, 2),
+                "refinement": round(refine_time - base_time, 2),
+            },
+            "cache": _cache_report(scraper, content_generator),
+        }
+
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=400, detail={"error": "Datos inválidos", "message": str(ve)}
+        )
+
+    except Exception as e:
+        logger.error(f"Error interno: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500, detail={"error": "Error interno", "message": str(e)}
+        )
+
+
+def _batch_item(index, url, request):
+    """Run the pipeline for one URL of a batch and turn any failure into a result line."""
+    start_time = time.time()
+    try:
+        args = (url, request.new_target_audience, request.new_tone, request.language,
+                request.pipeline, request.vision_deadline)
+        # Las llamadas a Groq del lote ceden la cuota a las solicitudes interactivas
+        with lane("batch"), hedge_budget():
+            response, shared = get_flight("pipeline").do(_pipeline_key(*args), run_content_pipeline, *args)
+        result = {"index": index, "url": url, "status": "ok", **response, "coalesced": shared}
+    except Exception as e:
+        logger.error(f"Error procesando {url} en el lote: {e}")
+        result = {"index": index, "url": url, "status": "error", "error": str(e)}
+    result["seconds"] = round(time.time() - start_time, 2)
+    return result
+
+
+@app.post("/content_generator/batch")
+def generate_content_batch(request: ContentBatchGeneration):
+    """Process many product URLs, streaming one NDJSON line per URL as soon as it finishes"""
+    logger.info(f"Iniciando lote de {len(request.urls)} URLs")
+    executor = get_batch_executor()
+    futures = [executor.submit(_batch_item, index, url, request) for index, url in enumerate(request.urls)]
+
+    def results():
+        start_time = time.time()
+        failed = 0
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                failed += result["status"] != "ok"
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            logger.info(
+                f"Lote completado en {time.time() - start_time:.2f} segundos: "
+                f"{len(futures) - failed} correctos, {failed} con error"
+            )
+        finally:
+            # Si el cliente se desconecta, no procesar las URLs que aún no empezaron
+            for future in futures:
+                future.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/content_generator/stream")
+async def generate_content_stream(request: ContentGeneration):
+    """Stream pipeline stages and then the refined script token by token as Server-Sent Events"""
+    logger.info(f"Iniciando generación en streaming para URL: {request.url}")
+
+    async def events():
+        start_time = time.time()
+        with hedge_budget():
+            try:
+                # Los campos de texto se envían en cuanto están listos; la visión sigue en segundo plano
+                scraper = FalabellaScraper(request.url)
+                metadata = await scraper.ascrape(defer_images=True)
+                yield _sse("scraped", {
+                    "title": metadata.get("title"),
+                    "price": metadata.get("price"),
+                    "available_sizes": metadata.get("available_sizes"),
+                    "field_sources": metadata.get("field_sources", {}),
+                    "seconds": round(time.time() - start_time, 2),
+                })
+
+                if scraper.image_future is not None:
+                    metadata["image_description"] = await asyncio.wrap_future(scraper.image_future)
+                yield _sse("images_described", {
+                    "image_description": metadata.get("image_description"),
+                    "seconds": round(time.time() - start_time, 2),
+                })
+
+                content_generator = ContentGenerator()
+                base_content = await content_generator.agenerate_text(metadata)
+                yield _sse("base_generated", {
+                    "content": base_content["content"],
+                    "seconds": round(time.time() - start_time, 2),
+                })
+
+                chunks = []
+                async for token in content_generator.astream_refined_content(
+                    base_content["content"], request.new_target_audience, request.new_tone, request.language
+                ):
+                    chunks.append(token)
+                    yield _sse("token", {"text": token})
+
+                yield _sse("done", {
+                    "refined_content": "".join(chunks),
+                    "field_sources": metadata.get("field_sources", {}),
+                    "stage_timings": metadata.get("stage_timings", {}),
+                    "cache": _cache_report(scraper, content_generator),
+                    "seconds": round(time.time() - start_time, 2),
+                })
+                logger.info(f"Generación en streaming completada en {time.time() - start_time:.2f} segundos")
+
+            except Exception as e:
+                logger.error(f"Error interno en streaming: {e}")
+                logger.error(traceback.format_exc())
+                yield _sse("error", {"error": "Error interno", "message": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Evitar que proxies intermedios acumulen la respuesta
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,187 @@
+import os
+import json
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from dotenv import load_dotenv
+from src.extraction_plan import HTML_PARSER, parse_product_html
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cargar variables del archivo .env
+load_dotenv()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+NEXT_DATA_SCRIPT = SoupStrainer("script", id="__NEXT_DATA__")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return a process-wide keep-alive session for product page requests."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("STATIC_FETCH_POOL_SIZE", "10"))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
+            })
+            _session = session
+        return _session
+
+
+def product_ids(product):
+    """IDs a product object answers to: its own ID and the SKUs of its variants."""
+    ids = {product.get(key) for key in ("id", "productId", "sku")}
+    for variant in product.get("variants") or []:
+        if isinstance(variant, dict):
+            ids.update(variant.get(key) for key in ("id", "sku"))
+    return {str(value) for value in ids if value}
+
+
+def find_product_data(node, product_id=None):
+    """Locate the product object inside a Next.js payload or a product API response.
+
+    With `product_id`, only a product whose ID or variant SKU matches it is returned.
+    """
+    if isinstance(node, dict):
+        product = node.get("productData")
+        if isinstance(product, dict) and product.get("name") and (
+                product_id is None or product_id in product_ids(product)):
+            return product
+        if isinstance(node.get("name"), str) and isinstance(node.get("variants"), list) and (
+                product_id is None or product_id in product_ids(node)):
+            return node
+        for value in node.values():
+            found = find_product_data(value, product_id)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = find_product_data(value, product_id)
+            if found:
+                return found
+    return None
+
+
+def _format_price(prices):
+    """Pick the current (non-crossed) price from a Falabella price list."""
+    if not prices:
+        return None
+    current = [p for p in prices if not p.get("crossed")] or prices
+    price = current[0]
+    amount = price.get("price")
+    if isinstance(amount, list):
+        amount = amount[0] if amount else None
+    if not amount:
+        return None
+    return f"{price.get('symbol', '').strip()} {amount}".strip()
+
+
+def product_fields(product):
+    """Map a Falabella product object to the scraper's field names."""
+    fields = {}
+    variants = product.get("variants") or []
+    first_variant = variants[0] if variants else {}
+
+    if product.get("name"):
+        fields["title"] = product["name"].strip()
+
+    price = _format_price(first_variant.get("prices"))
+    if price:
+        fields["price"] = price
+
+    sizes = []
+    for variant in variants:
+        size = (variant.get("attributes") or {}).get("size")
+        if size and size not in sizes:
+            sizes.append(size)
+    if sizes:
+        fields["available_sizes"] = sizes
+
+    image_links = []
+    for media in first_variant.get("medias") or []:
+        url = media.get("url")
+        if url and url not in image_links:
+            image_links.append(url)
+    if image_links:
+        fields["image_links"] = image_links[:6]
+
+    specifications = {}
+    for spec in (product.get("attributes") or {}).get("specifications") or []:
+        if spec.get("name") and spec.get("value"):
+            specifications[spec["name"]] = spec["value"]
+    if specifications:
+        fields["specifications"] = specifications
+
+    description = product.get("longDescription") or product.get("description")
+    if description:
+        text = BeautifulSoup(description, "html.parser").get_text(" ", strip=True)
+        if len(text) > 20:
+            fields["additional_info"] = text
+
+    return fields
+
+
+class StaticPage:
+    """Result of the plain HTTP tier: raw HTML, its soup and fields read from embedded JSON."""
+
+    def __init__(self, html, soup, page_title, fields):
+        self.html = html
+        self.soup = soup
+        self.page_title = page_title
+        self.fields = fields
+
+
+class StaticProductFetcher:
+    """Fetch a product page over plain HTTP and read the embedded Next.js product data."""
+
+    def __init__(self, timeout=None, session=None):
+        self.timeout = timeout or float(os.getenv("STATIC_FETCH_TIMEOUT", "5"))
+        self.session = session or get_http_session()
+
+    def fetch(self, url):
+        """Download the page and return a StaticPage, or None if the request fails."""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.warning(f"Descarga estática fallida. Código de estado: {response.status_code}")
+                return None
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Error en la descarga estática de la página: {e}")
+            return None
+
+        html = response.text
+        fields = self.parse_next_data(html)
+        soup, page_title = parse_product_html(html)
+        logger.info(f"Página descargada sin navegador; campos en JSON embebido: {list(fields.keys())}")
+        return StaticPage(html, soup, page_title, fields)
+
+    def parse_next_data(self, html):
+        """Extract product fields from the `__NEXT_DATA__` script, if present."""
+        fields = {}
+        script = BeautifulSoup(html, HTML_PARSER, parse_only=NEXT_DATA_SCRIPT).find("script")
+        if not script or not script.string:
+            return fields
+
+        try:
+            product = find_product_data(json.loads(script.string))
+        except ValueError as e:
+            logger.warning(f"No se pudo interpretar __NEXT_DATA__: {e}")
+            return fields
+        if not product:
+            return fields
+        return product_fields(product)
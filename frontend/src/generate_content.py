@@ -1,36 +1,72 @@
+import json
 import requests
 from models.content_generation_models import ContentGeneration
 import streamlit as st
 
 
-def compute_content(payload: ContentGeneration, server_url: str):
+def clean_content(generated_content):
+    """Quitar artefactos del parser del texto generado."""
+    # Limpiar el prefijo "refined_content=" si existe
+    if generated_content.startswith("refined_content="):
+        generated_content = generated_content[len("refined_content="):]
+
+    # Reemplazar los saltos de línea literales "\n" con espacios
+    return generated_content.replace("\\n", " ")
+
+
+def iter_events(response):
+    """Recorrer un stream de Server-Sent Events y devolver pares (evento, datos)."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data.append(line[len("data:"):].strip())
+            continue
+        # Una línea vacía cierra el evento
+        if event and data:
+            yield event, json.loads("\n".join(data))
+        event, data = None, []
+
+
+def compute_content(payload: ContentGeneration, server_url: str, on_stage=None, on_token=None):
+    """Generar el guion leyendo el stream del backend.
+
+    `on_stage(evento, datos)` se llama al terminar cada etapa y `on_token(texto_acumulado)`
+    con cada fragmento del guion, para mostrar el progreso en la interfaz.
+    """
     try:
-        # Enviar solicitud POST al servidor con el payload
+        # Enviar solicitud POST al endpoint de streaming con el payload
         r = requests.post(
-            server_url,
+            server_url.rstrip("/") + "/stream",
             json=payload.dict(),
-            headers={"Content-Type": "application/json"},
-            timeout=60
+            headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+            stream=True,
+            # El límite de lectura aplica entre eventos, no a toda la generación
+            timeout=(10, 90)
         )
 
         # Lanzar excepción si la solicitud falla
         r.raise_for_status()
 
-        # Extraer el contenido generado de la respuesta
-        response_data = r.json()
-        
-        # Obtener el contenido refinado del diccionario de respuesta
-        generated_content = response_data.get("generated_content", {}).get("refined_content", "")
-        
-        # Limpiar el prefijo "refined_content=" si existe
-        if generated_content.startswith("refined_content="):
-            generated_content = generated_content[len("refined_content="):]
-            
-        # Reemplazar los saltos de línea literales "\n" con espacios
-        generated_content = generated_content.replace("\\n", " ")
-        
-        return generated_content
+        generated_content = ""
+        with r:
+            for event, data in iter_events(r):
+                if event == "token":
+                    generated_content += data["text"]
+                    if on_token:
+                        on_token(generated_content)
+                elif event == "done":
+                    generated_content = data.get("refined_content", generated_content)
+                elif event == "error":
+                    st.error(f"Error en el servidor: {data.get('message')}")
+                    return None
+                elif on_stage:
+                    on_stage(event, data)
+
+        return clean_content(generated_content) or None
     except requests.exceptions.RequestException as e:
         # Manejar excepciones de solicitud y devolver un mensaje de error
         st.error(f"Error al comunicarse con el servidor: {str(e)}")
-        return None
\ No newline at end of file
+        return None
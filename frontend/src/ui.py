@@ -104,69 +104,88 @@ with col_button[1]:
 # Procesamiento y resultado
 if generate_button:
     if input_url and new_target_audience and new_tone and language:
-        with st.spinner("⏳ Generando guion... Esto puede tomar unos segundos."):
-            backend_url = os.getenv("BACKEND_URL", "http://backend:8004/content_generator")
-            # Crear payload usando el modelo ContentGeneration
-            payload = ContentGeneration(
-                url=input_url,
-                new_target_audience=new_target_audience,
-                new_tone=new_tone,
-                language=language,
-            )
-
-            # Llamar a la función compute_content para generar el guion
-            refined_script = compute_content(payload, backend_url)
-
-            # Mostrar el guion generado y agregar botón de descarga
-            if refined_script:
-                st.success("¡Guion generado con éxito!")
-                
-                # Sección de resultados con estilo
-                st.markdown("---")
-                st.header("📝 Guion Finalizado")
-                
-                # Mostrar resumen de parámetros
-                st.markdown("**Detalles del guion:**")
-                details_col1, details_col2 = st.columns(2)
-                with details_col1:
-                    st.info(f"**Audiencia:** {new_target_audience}")
-                    st.info(f"**Idioma:** {language}")
-                with details_col2:
-                    st.info(f"**Tono:** {new_tone}")
-                
-                # Mostrar el guion en un área de texto
-                st.markdown("### Contenido del guion:")
-                st.text_area("", refined_script, height=250)
-                
-                # Preparar datos para descargar
-                script_data = {
-                    "url": input_url,
-                    "target_audience": new_target_audience,
-                    "tone": new_tone,
-                    "language": language,
-                    "script": refined_script
-                }
-                
-                script_json = json.dumps(script_data, indent=2, ensure_ascii=False)
-                
-                # Opciones de descarga
-                download_col1, download_col2 = st.columns(2)
-                with download_col1:
-                    st.download_button(
-                        label="📥 Descargar Guion en JSON",
-                        data=script_json,
-                        file_name="guion_generado.json",
-                        mime="application/json",
-                    )
-                with download_col2:
-                    st.download_button(
-                        label="📄 Descargar Guion como Texto",
-                        data=refined_script,
-                        file_name="guion_generado.txt",
-                        mime="text/plain",
-                    )
-            else:
-                st.error("No se pudo generar el guion. Por favor, verifica que la URL sea de un producto válido de Falabella Perú e intenta nuevamente.")
+        status = st.status("⏳ Generando guion... Esto puede tomar unos segundos.", expanded=True)
+        script_preview = st.empty()
+
+        def show_stage(event, data):
+            # Mostrar cada etapa del pipeline en cuanto el backend la completa
+            if event == "scraped":
+                status.write(f"🔎 Producto encontrado: **{data.get('title')}** ({data.get('price')}) — {data.get('seconds')}s")
+            elif event == "images_described":
+                status.write(f"🖼️ Imágenes analizadas — {data.get('seconds')}s")
+            elif event == "base_generated":
+                status.write(f"📝 Guion base generado — {data.get('seconds')}s")
+                status.update(label="✍️ Adaptando el guion a tu audiencia...")
+
+        def show_tokens(text):
+            # El guion aparece a medida que el modelo lo escribe
+            script_preview.markdown(text)
+
+        backend_url = os.getenv("BACKEND_URL", "http://backend:8004/content_generator")
+        # Crear payload usando el modelo ContentGeneration
+        payload = ContentGeneration(
+            url=input_url,
+            new_target_audience=new_target_audience,
+            new_tone=new_tone,
+            language=language,
+        )
+
+        # Llamar a la función compute_content para generar el guion
+        refined_script = compute_content(payload, backend_url, on_stage=show_stage, on_token=show_tokens)
+        script_preview.empty()
+
+        # Mostrar el guion generado y agregar botón de descarga
+        if refined_script:
+            status.update(label="✅ Guion generado", state="complete", expanded=False)
+            st.success("¡Guion generado con éxito!")
+            
+            # Sección de resultados con estilo
+            st.markdown("---")
+            st.header("📝 Guion Finalizado")
+            
+            # Mostrar resumen de parámetros
+            st.markdown("**Detalles del guion:**")
+            details_col1, details_col2 = st.columns(2)
+            with details_col1:
+                st.info(f"**Audiencia:** {new_target_audience}")
+                st.info(f"**Idioma:** {language}")
+            with details_col2:
+                st.info(f"**Tono:** {new_tone}")
+            
+            # Mostrar el guion en un área de texto
+            st.markdown("### Contenido del guion:")
+            st.text_area("", refined_script, height=250)
+            
+            # Preparar datos para descargar
+            script_data = {
+                "url": input_url,
+                "target_audience": new_target_audience,
+                "tone": new_tone,
+                "language": language,
+                "script": refined_script
+            }
+            
+            script_json = json.dumps(script_data, indent=2, ensure_ascii=False)
+            
+            # Opciones de descarga
+            download_col1, download_col2 = st.columns(2)
+            with download_col1:
+                st.download_button(
+                    label="📥 Descargar Guion en JSON",
+                    data=script_json,
+                    file_name="guion_generado.json",
+                    mime="application/json",
+                )
+            with download_col2:
+                st.download_button(
+                    label="📄 Descargar Guion como Texto",
+                    data=refined_script,
+                    file_name="guion_generado.txt",
+                    mime="text/plain",
+                )
+        else:
+            status.update(label="❌ No se pudo generar el guion", state="error")
+            st.error("No se pudo generar el guion. Por favor, verifica que la URL sea de un producto válido de Falabella Perú e intenta nuevamente.")
     else:
         # Mostrar advertencia si falta algún campo
         st.warning("⚠️ Por favor, completa todos los campos antes de generar el guion. Recuerda que solo funcionan URLs de productos de Falabella Perú.")